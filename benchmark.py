@@ -0,0 +1,242 @@
+#!python3
+import argparse
+import os
+import io
+import csv
+import json
+import glob
+import time
+import random
+import tempfile
+from contextlib import redirect_stdout
+
+import preprocess
+
+LENDINGCLUB = "lc"
+PROSPER = "prosper"
+
+# Directory of the target configurations the synthetic files are made for
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "configs")
+
+GRADES = "ABCDEFG"
+PROSPER_RATINGS = ["AA", "A", "B", "C", "D", "E", "HR"]
+
+def main():
+    """
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", choices=[LENDINGCLUB, PROSPER, "both"], default="both", help="Which loan data layout to generate")
+    parser.add_argument("--rows", type=int, default=100000, help="Number of loans in each synthetic CSV file")
+    parser.add_argument("--extra-columns", type=int, default=80, help="Unconfigured columns added to LendingClub files, real dumps have over 100 columns")
+    parser.add_argument("--missing-rate", type=float, default=0.002, help="Chance of each cell being empty")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the generated data")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of processes parsing each CSV file")
+    parser.add_argument("--repeat", type=int, default=3, help="Times each stage is run, the fastest run is reported")
+    parser.add_argument("--out-dir", type=str, help="Keep the generated files and outputs in this directory")
+    parser.add_argument("--generate-only", action="store_true", help="Only write the synthetic CSV files (needs --out-dir)")
+    parser.add_argument("--json", type=str, help="Save the results to this file")
+    parser.add_argument("--baseline", type=str, help="Compare rows/sec with the results saved by an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Slowdown against the baseline reported as a regression")
+    args = parser.parse_args()
+
+    if(args.generate_only and args.out_dir is None):
+        parser.error("--generate-only needs --out-dir")
+
+    datasets = [LENDINGCLUB, PROSPER] if args.dataset == "both" else [args.dataset]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_dir = args.out_dir if args.out_dir is not None else temp_dir
+        os.makedirs(out_dir, exist_ok=True)
+
+        results = {}
+        for dataset in datasets:
+            csv_file = os.path.join(out_dir, dataset + "_synthetic.csv")
+            start = time.perf_counter()
+            if(dataset == LENDINGCLUB):
+                write_lendingclub_csv(csv_file, args.rows, args.seed, args.missing_rate, args.extra_columns)
+            else:
+                write_prosper_csv(csv_file, args.rows, args.seed, args.missing_rate)
+            print("Generated " + csv_file + " (" + str(os.path.getsize(csv_file)) + " bytes) in", round(time.perf_counter() - start, 2), "s")
+            if(args.generate_only): continue
+
+            config_files = sorted(glob.glob(os.path.join(CONFIG_DIR, dataset + "_*.json")))
+            results[dataset] = benchmark_csv_file(csv_file, config_files, args.repeat, args.jobs)
+            print_results(dataset, results[dataset])
+
+    if(args.generate_only):
+        return
+
+    if(args.json is not None):
+        with open(args.json, 'w', encoding="utf8") as f:
+            json.dump({"rows": args.rows, "jobs": args.jobs, "extra_columns": args.extra_columns, "missing_rate": args.missing_rate, "results": results}, f, indent=1)
+        print("Saved results " + args.json)
+
+    if(args.baseline is not None):
+        with open(args.baseline, 'r', encoding="utf8") as f:
+            baseline = json.load(f)["results"]
+        if(find_regressions(baseline, results, args.tolerance)):
+            exit(1)
+
+def lendingclub_columns(rng, extra_columns=0):
+    """ Header and value generators of a LendingClub LoanStats file, in file order
+    """
+    def grade():
+        return rng.choice(GRADES)
+    columns = [
+        ("id", lambda: str(rng.randint(1000000, 9999999))),
+        ("loan_amnt", lambda: str(rng.randrange(1000, 35025, 25))),
+        ("term", lambda: rng.choice([" 36 months", " 60 months"])),
+        ("int_rate", lambda: "%.2f%%" % rng.uniform(5, 26)),
+        ("installment", lambda: "%.2f" % rng.uniform(30, 1300)),
+        ("grade", grade),
+        ("sub_grade", lambda: grade() + str(rng.randint(1, 5))),
+        ("emp_length", lambda: rng.choice(["< 1 year", "1 year", "2 years", "3 years", "5 years", "8 years", "10+ years", "n/a"])),
+        ("home_ownership", lambda: rng.choice(["RENT", "OWN", "MORTGAGE", "OTHER"])),
+        ("annual_inc", lambda: "%.2f" % rng.lognormvariate(11, 0.5)),
+        ("verification_status", lambda: rng.choice(["Verified", "Not Verified", "Source Verified"])),
+        ("loan_status", lambda: rng.choice(["Fully Paid", "Fully Paid", "Charged Off", "Current", "Late (31-120 days)", "In Grace Period"])),
+        ("purpose", lambda: rng.choice(["debt_consolidation", "credit_card", "home_improvement", "car", "small_business", "other"])),
+        ("desc", lambda: rng.choice(["", "Borrower added on 12/01/11 > I need, \"this\" loan<br>\nto consolidate", "plain description"])),
+        ("dti", lambda: "%.2f" % rng.uniform(0, 35)),
+        ("fico_range_low", lambda: str(rng.randrange(660, 850, 5))),
+        ("inq_last_6mths", lambda: str(rng.randint(0, 8))),
+        ("open_acc", lambda: str(rng.randint(1, 40))),
+        ("revol_bal", lambda: str(rng.randint(0, 120000))),
+        ("revol_util", lambda: "%.1f%%" % rng.uniform(0, 110)),
+        ("total_acc", lambda: str(rng.randint(2, 80))),
+    ]
+    for column in range(extra_columns):
+        columns.append(("extra_" + str(column), lambda: "%.2f" % rng.uniform(0, 1000)))
+    return columns
+
+def prosper_columns(rng):
+    """ Header and value generators of a Prosper loans file, in file order
+    """
+    return [
+        ("loan_number", lambda: str(rng.randint(1, 9999999))),
+        ("amount_funded", lambda: str(rng.randrange(2000, 35001, 25))),
+        ("listing_term", lambda: rng.choice(["12", "36", "60"])),
+        ("borrower_rate", lambda: "%.4f" % rng.uniform(0.05, 0.32)),
+        ("listing_monthly_payment", lambda: "%.2f" % rng.uniform(50, 1300)),
+        ("prosper_rating", lambda: rng.choice(PROSPER_RATINGS)),
+        ("months_employed", lambda: str(rng.randint(0, 480))),
+        ("is_homeowner", lambda: rng.choice(["True", "False"])),
+        ("stated_monthly_income", lambda: "%.2f" % rng.lognormvariate(8.5, 0.5)),
+        ("income_verifiable", lambda: rng.choice(["True", "False"])),
+        ("fico_low", lambda: str(rng.randrange(600, 850, 20))),
+        ("inquiries_last6_months", lambda: str(rng.randint(0, 8))),
+        ("employment_status_description", lambda: rng.choice(["Employed", "Self-employed", "Retired", "Other"])),
+        ("occupation", lambda: rng.choice(["Professional", "Computer Programmer", "Teacher", "Nurse (RN)", "Sales - Retail", "Other"])),
+        ("borrower_state", lambda: rng.choice(["CA", "NY", "TX", "FL", "IL", "WA", "GA", "OH", "NJ", "PA"])),
+        ("prior_prosper_loans", lambda: str(rng.randint(0, 4))),
+        ("monthly_debt", lambda: "%.2f" % rng.uniform(0, 5000)),
+        ("current_delinquencies", lambda: str(rng.choice([0, 0, 0, 0, 1, 2]))),
+        ("current_credit_lines", lambda: str(rng.randint(1, 40))),
+        ("bankcard_utilization", lambda: "%.2f" % rng.uniform(0, 1.2)),
+        ("status", lambda: rng.choice(["COMPLETED", "COMPLETED", "CURRENT", "CHARGEOFF", "DEFAULTED"])),
+    ]
+
+def write_lendingclub_csv(csv_file, rows, seed=0, missing_rate=0.0, extra_columns=0):
+    """ Write a synthetic LendingClub file: a metadata line before the quoted header
+    (LINES_TO_SKIP of 1), "%" suffixed rates, descriptions holding quotes, commas and
+    newlines, empty cells and the summary lines real dumps end with.
+    """
+    rng = random.Random(seed)
+    write_synthetic_csv(csv_file, lendingclub_columns(rng, extra_columns), rows, rng, missing_rate,
+                        ["Notes offered by Prospectus (https://www.lendingclub.com/info/prospectus.action)"],
+                        ["", "Total amount funded in policy code 1: " + str(rows * 12000)])
+
+def write_prosper_csv(csv_file, rows, seed=0, missing_rate=0.0):
+    """ Write a synthetic Prosper file: quoted header on the first line and empty cells
+    """
+    rng = random.Random(seed)
+    write_synthetic_csv(csv_file, prosper_columns(rng), rows, rng, missing_rate)
+
+def write_synthetic_csv(csv_file, columns, rows, rng, missing_rate=0.0, metadata_lines=(), footer_lines=()):
+    """ Write rows of generated values with every value quoted, like the loan dumps
+    """
+    with open(csv_file, 'w', encoding="utf8", newline="", buffering=preprocess.WRITE_BUFFER_SIZE) as f:
+        for line in metadata_lines:
+            f.write(line + "\n")
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        writer.writerow([name for name,generate in columns])
+        generators = [generate for name,generate in columns]
+        for row in range(rows):
+            writer.writerow(["" if rng.random() < missing_rate else generate() for generate in generators])
+        for line in footer_lines:
+            f.write(line + "\n")
+
+def benchmark_csv_file(csv_file, config_files, repeat=3, jobs=1):
+    """ Time the parse, process, write and streaming stages of preprocess.py on a file,
+    for all targets at once, parsing in "jobs" processes. Returns stage => fastest seconds and rows/sec of it.
+    """
+    targets = [preprocess.load_config(config_file) for config_file in config_files]
+    timings = {}
+    def record(stage, seconds, rows):
+        best = timings.get(stage)
+        if(best is None or seconds < best["seconds"]):
+            timings[stage] = {"seconds": round(seconds, 6), "rows": rows, "rows_per_second": round(rows/seconds, 1) if seconds > 0 else None}
+
+    # Progress and per-column prints would swamp the results
+    with redirect_stdout(io.StringIO()):
+        for run in range(repeat):
+            start = time.perf_counter()
+            column_table, missing_rows, row_number = preprocess.parse_csv_file(csv_file, targets, jobs)
+            record("parse", time.perf_counter() - start, row_number)
+            row_masks = preprocess.create_row_masks(targets, column_table, missing_rows, row_number)
+
+            processed = []
+            target_artifacts = {}
+            start = time.perf_counter()
+            for target in targets:
+                prefix = preprocess.output_prefix(csv_file, target)
+                target_table, target_rows = preprocess.select_rows(column_table, target["columns"].keys(), row_masks[target["name"]])
+                output_columns, target_artifacts[target["name"]] = preprocess.process_target(target, target_table, prefix)
+                processed.append((target, prefix, target_rows, output_columns))
+            record("process", time.perf_counter() - start, sum([target_rows for target, prefix, target_rows, output_columns in processed]))
+
+            start = time.perf_counter()
+            for target, prefix, target_rows, output_columns in processed:
+                preprocess.write_processed_csv(prefix, output_columns)
+            record("write csv", time.perf_counter() - start, sum([target_rows for target, prefix, target_rows, output_columns in processed]))
+
+            start = time.perf_counter()
+            svm_rows = 0
+            for target, prefix, target_rows, output_columns in processed:
+                svm_rows += preprocess.format_for_libsvm(prefix, target_rows, output_columns, target)
+            record("write libsvm", time.perf_counter() - start, svm_rows)
+
+            start = time.perf_counter()
+            preprocess.fit_csv_file(csv_file, targets)
+            record("streaming fit", time.perf_counter() - start, row_number)
+
+            start = time.perf_counter()
+            preprocess.transform_csv_file(csv_file, targets, preprocess.create_artifact(csv_file, target_artifacts), True, True)
+            record("streaming transform", time.perf_counter() - start, row_number)
+
+    return timings
+
+def print_results(dataset, timings):
+    """ Print the stage timings of a dataset
+    """
+    print(dataset)
+    for stage,timing in timings.items():
+        print("  " + stage.ljust(20), str(timing["seconds"]).rjust(10), "s", str(timing["rows_per_second"]).rjust(12), "rows/s")
+
+def find_regressions(baseline, results, tolerance=0.2):
+    """ Print the stages whose rows/sec dropped more than tolerance below the baseline.
+    Returns whether there were any.
+    """
+    regressed = False
+    for dataset,timings in results.items():
+        for stage,timing in timings.items():
+            base = baseline.get(dataset, {}).get(stage)
+            if(base is None or not base["rows_per_second"] or not timing["rows_per_second"]): continue
+            change = timing["rows_per_second"]/base["rows_per_second"] - 1
+            if(change < -tolerance):
+                regressed = True
+                print("Regression:", dataset, stage, str(round(change*100, 1)) + "% rows/sec")
+    if(not regressed):
+        print("No regressions against the baseline")
+    return regressed
+
+if __name__ == "__main__": main()
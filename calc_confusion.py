@@ -1,40 +1,149 @@
 import argparse
+import json
+from collections import Counter
+from itertools import zip_longest
+
+from compressed import open_text
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("tf", type=str, help="file with test data (label first column)")
     parser.add_argument("rf", type=str, help="file with results (label first column)")
+    parser.add_argument("-o", "--output", type=str, help="Where to write the confusion matrix as CSV (default <rf>.confusion.csv)")
+    parser.add_argument("--json", type=str, help="Also write the confusion matrix and all metrics to this JSON file")
+    parser.add_argument("--ordinal", action="store_true", help="Classes are ordered grades, also report predictions at most one grade off")
     args = parser.parse_args()
     
-    # Get set of possible classes
-    class_types = set()
-
-    actual_classes = []
-    with open(args.tf, 'r') as tf:
-        for line in tf:
-            label = int(line.split()[0])
-            actual_classes.append(label)
-            class_types.add(label)
-
-    predicted_classes = []
-    with open(args.rf, 'r') as rf:
-        for line in rf:
-            label = int(line.split()[0])
-            predicted_classes.append(label)
-            
-    # Create data struct to keep track of predictions
-    confusion_matrix = [[0 for col in range(max(class_types) + 1)] for row in range(max(class_types) + 1)]
-        
-    for i in range(len(actual_classes)):
-        actual_class = actual_classes[i]
-        predicted_class = predicted_classes[i]
-        confusion_matrix[actual_class][predicted_class] += 1
+    try:
+        pair_counts = count_predictions(args.tf, args.rf)
+    except ValueError as e:
+        print(e)
+        exit(1)
+
+    confusion_matrix = counts_to_matrix(pair_counts)
+    metrics = compute_metrics(pair_counts, args.ordinal)
 
     for row in confusion_matrix:
         print(row, sum(row))
-        
-    with open("dat.csv", "w") as f:
+    print_metrics(metrics)
+
+    output_file = args.output if args.output is not None else args.rf + ".confusion.csv"
+    with open(output_file, "w") as f:
         for row in confusion_matrix:
             f.write(",".join([str(x) for x in row]) + "\n")
 
+    if(args.json is not None):
+        metrics["confusion_matrix"] = confusion_matrix
+        with open(args.json, "w") as f:
+            json.dump(metrics, f, indent=1)
+
+def read_labels(label_file):
+    """ Yield the label (first column) of each line of a file, compressed or not, one line at a time
+    """
+    with open_text(label_file) as f:
+        for line in f:
+            fields = line.split(None, 1)
+            if(fields):
+                yield int(fields[0])
+
+def count_predictions(test_file, results_file):
+    """ Count each (actual, predicted) class pair, reading both files in lockstep
+    so only the counts are held in memory.
+    Raises ValueError if the files do not have the same number of labels.
+    """
+    pair_counts = Counter(zip_longest(read_labels(test_file), read_labels(results_file)))
+    check_pair_counts(pair_counts, test_file, results_file)
+    return pair_counts
+
+def check_pair_counts(pair_counts, actual_name="actual classes", predicted_name="predicted classes"):
+    """ Raise ValueError if one side ran out before the other, zip_longest pads it with None
+    """
+    actual_count = sum([count for (actual, predicted),count in pair_counts.items() if actual is not None])
+    predicted_count = sum([count for (actual, predicted),count in pair_counts.items() if predicted is not None])
+    if(actual_count != predicted_count):
+        raise ValueError(actual_name + " has " + str(actual_count) + " labels but " + predicted_name + " has " + str(predicted_count))
+
+def counts_to_matrix(pair_counts, class_types=None):
+    """ Confusion matrix from class pair counts, rows are actual and columns predicted classes
+    """
+    if(class_types is None):
+        class_types = set()
+    class_types = set(class_types)
+    for actual,predicted in pair_counts.keys():
+        class_types.add(actual)
+        class_types.add(predicted)
+    if(not class_types):
+        return []
+
+    # Create data struct to keep track of predictions
+    confusion_matrix = [[0 for col in range(max(class_types) + 1)] for row in range(max(class_types) + 1)]
+    for (actual, predicted),count in pair_counts.items():
+        confusion_matrix[actual][predicted] += count
+
+    return confusion_matrix
+
+def compute_metrics(pair_counts, ordinal=False):
+    """ Accuracy, per-class precision/recall/F1 and their macro and micro averages
+    from class pair counts. With ordinal classes, also the share of predictions
+    at most one class off.
+    """
+    total = sum(pair_counts.values())
+    correct = sum([count for (actual, predicted),count in pair_counts.items() if actual == predicted])
+    class_types = sorted(set([actual for actual,predicted in pair_counts.keys()]) | set([predicted for actual,predicted in pair_counts.keys()]))
+
+    classes = {}
+    for label in class_types:
+        true_positives = pair_counts.get((label, label), 0)
+        support = sum([count for (actual, predicted),count in pair_counts.items() if actual == label])
+        predicted_count = sum([count for (actual, predicted),count in pair_counts.items() if predicted == label])
+        precision = safe_divide(true_positives, predicted_count)
+        recall = safe_divide(true_positives, support)
+        classes[label] = {"precision": precision, "recall": recall, "f1": f1_score(precision, recall), "support": support}
+
+    macro_precision = safe_divide(sum([scores["precision"] for scores in classes.values()]), len(classes))
+    macro_recall = safe_divide(sum([scores["recall"] for scores in classes.values()]), len(classes))
+    metrics = {
+        "total": total,
+        "accuracy": safe_divide(correct, total),
+        "classes": classes,
+        "macro": {"precision": macro_precision, "recall": macro_recall,
+                  "f1": safe_divide(sum([scores["f1"] for scores in classes.values()]), len(classes))},
+        # Every sample has one actual and one predicted class, so micro averages equal the accuracy
+        "micro": {"precision": safe_divide(correct, total), "recall": safe_divide(correct, total), "f1": safe_divide(correct, total)},
+    }
+    if(ordinal):
+        off_by_one = sum([count for (actual, predicted),count in pair_counts.items() if abs(actual - predicted) <= 1])
+        metrics["off_by_one_accuracy"] = safe_divide(off_by_one, total)
+    return metrics
+
+def safe_divide(numerator, denominator):
+    """ numerator/denominator, 0 when there is nothing to divide by
+    """
+    return numerator/denominator if denominator else 0.0
+
+def f1_score(precision, recall):
+    """ Harmonic mean of precision and recall
+    """
+    return safe_divide(2*precision*recall, precision + recall)
+
+def print_metrics(metrics):
+    """ Print a metrics report from "compute_metrics"
+    """
+    print("class precision recall f1 support")
+    for label,scores in metrics["classes"].items():
+        print(label, round(scores["precision"], 4), round(scores["recall"], 4), round(scores["f1"], 4), scores["support"])
+    for average in ["macro", "micro"]:
+        scores = metrics[average]
+        print(average, round(scores["precision"], 4), round(scores["recall"], 4), round(scores["f1"], 4), metrics["total"])
+    print("Accuracy", round(metrics["accuracy"], 4))
+    if("off_by_one_accuracy" in metrics):
+        print("Off by one accuracy", round(metrics["off_by_one_accuracy"], 4))
+
+def create_confusion_matrix(actual_classes, predicted_classes, class_types=None):
+    """ Count predictions of each actual class, rows are actual and columns predicted classes
+    """
+    pair_counts = Counter(zip_longest(actual_classes, predicted_classes))
+    check_pair_counts(pair_counts)
+    return counts_to_matrix(pair_counts, class_types)
+
 if __name__ == "__main__": main()
@@ -0,0 +1,70 @@
+import io
+import os
+import bz2
+import gzip
+import lzma
+import zipfile
+
+# Extension => module that reads and writes files compressed with it
+COMPRESSIONS = {"gz": gzip, "bz2": bz2, "xz": lzma}
+ZIP = "zip"
+
+def compression_of(path):
+    """ Compression of a file going by its extension, None for plain files
+    """
+    extension = os.path.splitext(path)[1][1:].lower()
+    if(extension in COMPRESSIONS or extension == ZIP):
+        return extension
+    return None
+
+def compressed_path(path, compression=None):
+    """ Name of a file written with a compression
+    """
+    return path + "." + compression if compression else path
+
+def open_text(path, mode="r", newline=None, buffering=-1):
+    """ Open a UTF-8 text file, (de)compressing .gz, .bz2 and .xz files on the fly.
+    .zip files can only be read, the first file in the archive is opened.
+    """
+    compression = compression_of(path)
+    if(compression in COMPRESSIONS):
+        return COMPRESSIONS[compression].open(path, mode + "t", encoding="utf8", newline=newline)
+    if(compression == ZIP):
+        if(mode != "r"):
+            raise ValueError("can not write .zip files, use gz, bz2 or xz")
+        archive = zipfile.ZipFile(path)
+        # The member keeps the archive file open until it is closed itself
+        stream = archive.open(first_member(archive, path))
+        archive.close()
+        return io.TextIOWrapper(stream, encoding="utf8", newline=newline)
+    return open(path, mode, encoding="utf8", newline=newline, buffering=buffering)
+
+def open_source(path):
+    """ Open a file for reading bytes, through its decompressor when it is compressed.
+    The first file of a .zip archive is read. Returns the raw file, whose
+    tell() is the offset into the compressed file, and the stream to read.
+    """
+    raw = open(path, 'rb')
+    try:
+        compression = compression_of(path)
+        if(compression == "gz"):
+            return (raw, gzip.GzipFile(fileobj=raw))
+        if(compression == "bz2"):
+            return (raw, bz2.BZ2File(raw))
+        if(compression == "xz"):
+            return (raw, lzma.LZMAFile(raw))
+        if(compression == ZIP):
+            archive = zipfile.ZipFile(raw)
+            return (raw, archive.open(first_member(archive, path)))
+        return (raw, raw)
+    except Exception:
+        raw.close()
+        raise
+
+def first_member(archive, path):
+    """ First file in a .zip archive
+    """
+    members = [member for member in archive.infolist() if not member.is_dir()]
+    if(not members):
+        raise ValueError(path + " holds no files")
+    return members[0]
@@ -0,0 +1,1756 @@
+#!python3
+import argparse
+import sqlite3
+import os
+import csv
+import json
+import math
+import random
+import hashlib
+import glob
+import mmap
+import sys
+import time
+import tracemalloc
+import multiprocessing
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import compress
+from multiprocessing import shared_memory
+
+import run_svm
+from compressed import COMPRESSIONS, compression_of, compressed_path, open_source, open_text
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+NORMALIZE = "normalize"
+CATEGORIZE = "categorize"
+NOTHING = "nothing"
+ENUMERATE = "enumerate"
+METHODS = (NORMALIZE, CATEGORIZE, NOTHING, ENUMERATE)
+
+# How libsvm samples are split into train/test and fold files
+ORDERED = "ordered"
+SHUFFLED = "shuffled"
+STRATIFIED = "stratified"
+SPLITS = (ORDERED, SHUFFLED, STRATIFIED)
+
+# Bytes buffered before output files are flushed to disk
+WRITE_BUFFER_SIZE = 1 << 20
+# Rows held in memory at a time when processing in chunks
+CHUNK_ROWS = 10000
+# Version of the binary column cache layout, bump when it changes
+CACHE_VERSION = 2
+# Smallest byte range of a CSV file given to a parsing process
+PARSE_RANGE_BYTES = 1 << 24
+# Rows inserted per transaction when staging a CSV file in SQLite
+DB_BATCH_ROWS = 100000
+# Version of the staged SQLite table layout, bump when it changes
+DB_VERSION = 3
+
+# Stages recorded by "profile_stage" when run with --profile, None otherwise
+profile_stages = None
+# Running peak memory of the enclosing stages, innermost last
+profile_peaks = []
+
+# Discrete columns are kept as integer codes into a small list of their values
+CategoricalColumn = namedtuple("CategoricalColumn", ["codes", "levels"])
+
+class OneHotColumn(object):
+    """ 0/1 column for one value of a categorical column.
+    Only the shared codes and the code of that value are stored.
+    """
+    def __init__(self, codes, code):
+        self.codes = codes
+        self.code = code
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        return 1 if self.codes[row] == self.code else 0
+
+    def __iter__(self):
+        code = self.code
+        return (1 if value == code else 0 for value in self.codes)
+
+def main():
+    """
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv_file", type=str, help="Path to CSV file, or a quoted glob pattern matching several to merge")
+    parser.add_argument("configs", type=str, nargs="+", help="Target configuration files (see configs/), all made from one load of the CSV file")
+    parser.add_argument("--input", type=str, action="append", default=[], metavar="CSV_FILE", help="Another CSV file (or quoted glob pattern) to merge with csv_file, can be repeated")
+    parser.add_argument("--output", type=str, metavar="NAME", help="Name output files NAME.<target>.* (default: the CSV file, or the common start of several)")
+    parser.add_argument("--svm", action="store_true", help="Create file formatted for libsvm")
+    parser.add_argument("--train", action="store_true", help="Create train/test files for libsvm")
+    parser.add_argument("--split", choices=SPLITS, default=ORDERED, help="Put the first samples in train (ordered), random ones (shuffled) or random ones per class (stratified)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of shuffled and stratified splits")
+    parser.add_argument("--folds", type=int, default=0, help="Also create this many cross-validation train/test file pairs")
+    parser.add_argument("--evaluate", action="store_true", help="Train and test an SVM on each target in process, split like --train (needs libsvm or scikit-learn)")
+    run_svm.add_svm_arguments(parser)
+    parser.add_argument("--sparse", action="store_true", help="Leave zero valued features out of the libsvm file")
+    parser.add_argument("--no-csv", action="store_true", help="Do not write the .processed.csv file")
+    parser.add_argument("--compress", choices=sorted(COMPRESSIONS.keys()), help="Compress the .processed.csv and .libsvm files (and train/test files made from them)")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of processes used to parse CSV files and process columns")
+    parser.add_argument("--legend", type=str, help="Reuse the legends written when processing this CSV file")
+    scaling_group = parser.add_mutually_exclusive_group()
+    scaling_group.add_argument("--fit", type=str, metavar="ARTIFACT", help="Save scaling stats, categories and legends to this file")
+    scaling_group.add_argument("--transform", type=str, metavar="ARTIFACT", help="Process the CSV file with a saved --fit artifact, in one streaming pass")
+    parser.add_argument("--chunked", action="store_true", help="Process the CSV file in two streaming passes with bounded memory")
+    parser.add_argument("--profile", type=str, metavar="JSON_FILE", help="Record wall time, rows/sec and peak memory of each stage and column to this file (tracing memory slows the run down)")
+    parser.add_argument("--cache", action="store_true", help="Keep the loaded columns in <csv_file>.cache and reuse them while the CSV file is unchanged")
+    parser.add_argument("--db", type=str, metavar="DB_FILE", help="Stage the configured columns in this SQLite database and load them from it, the CSV file is parsed again only when it or the columns change")
+    parser.add_argument("--db-columns", type=str, nargs="+", default=[], metavar="COLUMN", help="More columns to stage in --db for --where, e.g. addr_state issue_d")
+    parser.add_argument("--where", type=str, metavar="SQL", help="Only load the rows of --db matching this SQL condition, e.g. \"addr_state IN ('CA', 'NY')\"")
+    args = parser.parse_args()
+
+    csv_files, not_found = find_csv_files(args.csv_file, args.input)
+    if(not_found):
+        for path in not_found:
+            print("Could not find CSV file " + path)
+        exit(1)
+    output_name = args.output if args.output is not None else default_output_name(csv_files)
+
+    if(len(csv_files) > 1 and (args.chunked or args.transform is not None)):
+        parser.error("--chunked and --transform stream a single CSV file, merge several without them")
+
+    if(args.chunked and args.transform is not None):
+        parser.error("--transform already processes the CSV file in one streaming pass, --chunked is not needed")
+
+    if(args.db is not None):
+        if(len(csv_files) > 1 or args.chunked or args.transform is not None or args.cache):
+            parser.error("--db stages a single CSV file, it can not be used with several files, --chunked, --transform or --cache")
+    elif(args.where is not None or args.db_columns):
+        parser.error("--where and --db-columns need --db")
+
+    try:
+        targets = [load_config(config_file) for config_file in args.configs]
+        source_lines_to_skip(targets)
+        source_columns(targets)
+    except (OSError, ValueError) as e:
+        print("Bad configuration:", e)
+        exit(1)
+
+    if(args.folds == 1 or args.folds < 0):
+        parser.error("--folds needs at least 2 folds")
+
+    if(args.evaluate and (args.chunked or args.transform is not None)):
+        parser.error("--evaluate trains on the loaded columns, it can not be used with --chunked or --transform")
+
+    if(args.profile is not None):
+        start_profile()
+
+    if(args.chunked):
+        with profile_stage("fit"):
+            artifact = create_artifact(csv_files[0], fit_csv_file(csv_files[0], targets, args.legend))
+        if(args.fit is not None):
+            save_artifact(args.fit, artifact)
+        with profile_stage("transform"):
+            svm_rows = transform_csv_file(csv_files[0], targets, artifact, not args.no_csv, args.svm, args.sparse, args.compress, output_name)
+    elif(args.transform is not None):
+        try:
+            artifact = load_artifact(args.transform)
+        except (OSError, ValueError, KeyError) as e:
+            print("Bad fit artifact:", e)
+            exit(1)
+        with profile_stage("transform"):
+            try:
+                svm_rows = transform_csv_file(csv_files[0], targets, artifact, not args.no_csv, args.svm, args.sparse, args.compress, output_name)
+            except ValueError as e:
+                print("Can not transform " + csv_files[0] + ":", e)
+                exit(1)
+    else:
+        # Read column data of every target from the CSV files at once
+        with profile_stage("load", files=len(csv_files)) as stage:
+            if(args.db is not None):
+                try:
+                    column_table, row_masks, row_number = load_db_file(args.db, csv_files[0], targets, args.db_columns, args.where)
+                except sqlite3.Error as e:
+                    print("Could not load from " + args.db + ":", e)
+                    exit(1)
+            else:
+                column_table, row_masks, row_number = load_csv_files(csv_files, targets, args.cache, args.jobs)
+            stage["rows"] = row_number
+
+        target_artifacts = {}
+        svm_rows = {}
+        for target in targets:
+            print("Processing " + target["name"])
+            prefix = output_prefix(output_name, target)
+            legend_prefix = None if args.legend is None else output_prefix(args.legend, target)
+            with profile_stage("select rows", target=target["name"]) as stage:
+                target_table, target_rows = select_rows(column_table, target["columns"].keys(), row_masks[target["name"]])
+                stage["rows"] = target_rows
+            with profile_stage("process", target=target["name"], rows=target_rows):
+                output_columns, target_artifacts[target["name"]] = process_target(target, target_table, prefix, legend_prefix, args.jobs)
+
+            # Save processed data to a new file
+            if(not args.no_csv):
+                with profile_stage("write csv", target=target["name"], rows=target_rows):
+                    write_processed_csv(prefix, output_columns, args.compress)
+
+            if(args.svm):
+                with profile_stage("write libsvm", target=target["name"]) as stage:
+                    svm_rows[target["name"]] = format_for_libsvm(prefix, target_rows, output_columns, target, args.sparse, args.compress)
+                    stage["rows"] = svm_rows[target["name"]]
+
+            if(args.evaluate):
+                with profile_stage("evaluate", target=target["name"], rows=target_rows):
+                    evaluate_target(prefix, target_rows, output_columns, target, args.split, args.seed, run_svm.svm_options(args))
+
+        if(args.fit is not None):
+            save_artifact(args.fit, create_artifact(", ".join(csv_files), target_artifacts))
+
+    if(args.svm and args.train):
+        for target in targets:
+            with profile_stage("split", target=target["name"], rows=svm_rows.get(target["name"])):
+                create_test_train_files(output_prefix(output_name, target) + ".libsvm", target["train_perc"],
+                                        args.split, args.seed, args.folds, svm_rows.get(target["name"]), args.compress)
+
+    if(args.profile is not None):
+        save_profile(args.profile)
+
+def load_config(config_file):
+    """ Load a target configuration file. It holds:
+    lines_to_skip: any meta-data we want to skip over; how many rows until we get the header
+    columns: column_name => normalize|categorize|enumerate|nothing, in output order
+    label_column: used for SVM output, must be an enumerated column
+    set_labels: what type of samples do we want from the label column, and what
+                number corresponds to each class in the resulting libsvm file
+    train_perc: percent of the libsvm samples put in the train file
+    The target is named after the file.
+    """
+    with open(config_file, 'r', encoding="utf8") as f:
+        config = json.load(f)
+
+    target = {
+        "name": os.path.splitext(os.path.basename(config_file))[0],
+        "lines_to_skip": config.get("lines_to_skip", 0),
+        "columns": config["columns"],
+        "label_column": config["label_column"],
+        "set_labels": config["set_labels"],
+        "train_perc": config.get("train_perc", 50),
+    }
+    for column_name,method in target["columns"].items():
+        if(method not in METHODS):
+            raise ValueError(config_file + ": unknown method " + str(method) + " for column " + column_name)
+    if(target["columns"].get(target["label_column"]) != ENUMERATE):
+        raise ValueError(config_file + ": label column " + target["label_column"] + " must be an enumerated column")
+    return target
+
+def source_lines_to_skip(targets):
+    """ Lines before the header of the CSV file, all targets made from it must agree
+    """
+    lines_to_skip = set([target["lines_to_skip"] for target in targets])
+    if(len(lines_to_skip) > 1):
+        raise ValueError("targets disagree on lines_to_skip, they can not share a CSV file")
+    return lines_to_skip.pop()
+
+def source_columns(targets):
+    """ Columns to load for all targets: column name => how to store it (NORMALIZE or CATEGORIZE)
+    """
+    column_methods = {}
+    for target in targets:
+        for column_name,method in target["columns"].items():
+            storage = NORMALIZE if method == NORMALIZE else CATEGORIZE
+            if(column_methods.setdefault(column_name, storage) != storage):
+                raise ValueError("column " + column_name + " is numeric in one target and discrete in another")
+    return column_methods
+
+def output_prefix(output_name, target):
+    """ Output files of a target are named <output_name>.<target>.*
+    """
+    return output_name + "." + target["name"]
+
+def find_csv_files(csv_file, more_csv_files=()):
+    """ The CSV files to load: csv_file then more_csv_files, each a path or a glob pattern.
+    Returns the files and the paths that do not exist or patterns that match no file.
+    """
+    csv_files = []
+    not_found = []
+    for path in [csv_file] + list(more_csv_files):
+        if(glob.has_magic(path)):
+            matches = sorted(glob.glob(path))
+        else:
+            matches = [path] if os.path.exists(path) else []
+        if(not matches):
+            not_found.append(path)
+        csv_files.extend(matches)
+    return (csv_files, not_found)
+
+def default_output_name(csv_files):
+    """ Name of the output files: the CSV file, or the common start of several
+    (LoanStats3a.csv and LoanStats3b.csv make LoanStats3.merged)
+    """
+    if(len(csv_files) == 1):
+        return csv_files[0]
+    name = os.path.commonprefix(csv_files).rstrip("_-. ")
+    if(os.path.basename(name) == ""):
+        return os.path.join(name, "merged")
+    return name + ".merged"
+
+def start_profile():
+    """ Start recording stages for --profile, tracing memory allocations from here on
+    """
+    global profile_stages
+    profile_stages = []
+    tracemalloc.start()
+
+@contextmanager
+def profile_stage(name, **details):
+    """ Record the wall time, rows/sec and peak traced memory of the enclosed code
+    as a stage, when profiling. Yields the stage entry so the code can fill in
+    "rows" once it knows them. Nested stages are recorded on their own and
+    count towards the peak of the stages around them.
+    """
+    stage = dict({"stage": name}, **details)
+    if(profile_stages is None):
+        yield stage
+        return
+
+    # Keep the peak reached so far by the enclosing stage before starting a new one
+    if(profile_peaks):
+        profile_peaks[-1] = max(profile_peaks[-1], tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    profile_peaks.append(0)
+    start = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        seconds = time.perf_counter() - start
+        peak = max(profile_peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if(profile_peaks):
+            profile_peaks[-1] = max(profile_peaks[-1], peak)
+        tracemalloc.reset_peak()
+        stage["seconds"] = round(seconds, 6)
+        if(stage.get("rows") is not None and seconds > 0):
+            stage["rows_per_second"] = round(stage["rows"]/seconds, 1)
+        stage["peak_memory_bytes"] = peak
+        profile_stages.append(stage)
+
+def save_profile(profile_file):
+    """ Dump the recorded stages, in the order they finished, as JSON
+    """
+    report = {"argv": sys.argv, "stages": profile_stages, "peak_memory_bytes": tracemalloc.get_traced_memory()[1]}
+    tracemalloc.stop()
+    if(resource is not None):
+        # Kilobytes on Linux, bytes on macOS
+        report["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(profile_file, 'w', encoding="utf8") as f:
+        json.dump(report, f, indent=1)
+    print("Saved profile " + profile_file)
+
+def process_target(target, column_table, prefix, legend_prefix=None, jobs=1):
+    """ Process the columns of one target from its rows of the CSV file.
+    Returns the output columns, in output order, and what is needed to repeat it on new files.
+    """
+    # Numeric columns are independent of each other, normalize them up front
+    numeric_columns = [column_name for column_name,method in target["columns"].items()
+                       if method == NORMALIZE and column_table.get(column_name) is not None]
+    with profile_stage("normalize", target=target["name"], columns=len(numeric_columns), jobs=jobs):
+        column_stats_table = normalize_columns(column_table, numeric_columns, jobs, target["name"])
+
+    # Process the columns we want, keeping what is needed to repeat it on new files
+    output_columns = {}
+    artifact_columns = []
+    for column_name,method in target["columns"].items():
+        if(column_table.get(column_name) is not None):
+            if(method == NORMALIZE):
+                stats = column_stats_table[column_name]
+                if(isinstance(stats, Exception)):
+                    print("Error on column", column_name, stats)
+                else:
+                    output_columns[column_name] = column_table[column_name]
+                    artifact_columns.append(dict(name=column_name, method=method, **stats))
+                continue
+            with profile_stage("column", target=target["name"], column=column_name, method=method, rows=len(column_table[column_name].codes)):
+                if(method == CATEGORIZE):
+                    new_columns = categorize_column(column_table[column_name])
+                    for new_name, new_column in new_columns.items():
+                        output_columns[new_name] = new_column
+                    artifact_columns.append({"name": column_name, "method": method, "levels": list(new_columns.keys())})
+                elif(method == NOTHING):
+                    output_columns[column_name] = decode_column(column_table[column_name])
+                    artifact_columns.append({"name": column_name, "method": method})
+                elif(method == ENUMERATE):
+                    legend_file = find_legend_file(legend_prefix, column_name)
+                    output_columns[column_name] = enumerate_column(prefix, column_table[column_name], column_name, legend_file)
+                    label_legend = read_legend(prefix + "." + column_name + ".legend.txt")
+                    artifact_columns.append({"name": column_name, "method": method, "legend": label_legend})
+        else:
+            print("Skipping column " + column_name)
+
+    return (output_columns, {"label_column": target["label_column"], "columns": artifact_columns})
+
+def write_processed_csv(prefix, output_columns, compression=None):
+    """ Write the processed columns to <prefix>.processed.csv, a row at a time
+    """
+    header_list = list(output_columns.keys())
+    with open_text(compressed_path(prefix + ".processed.csv", compression), 'w', newline="", buffering=WRITE_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(header_list)
+        writer.writerows(zip(*[output_columns[header] for header in header_list]))
+
+def create_test_train_files(svm_file_path, train_perc=50, split=ORDERED, seed=0, folds=0, num_rows=None, compression=None):
+    """ Split a libsvm file into .train.libsvm and .test.libsvm files, and into
+    .fold<k>.train.libsvm/.fold<k>.test.libsvm pairs when folds is given, in one pass.
+    Ordered splits need the number of samples, the file is only counted first if it is not given.
+    With a compression, the libsvm file and all files made from it are compressed.
+    """
+    if(split == ORDERED and num_rows is None):
+        num_rows = 0
+        with open_text(compressed_path(svm_file_path, compression)) as svm_in_f:
+            for line in svm_in_f:
+                num_rows += 1
+
+    assign_train = create_split_assigner([train_perc, 100 - train_perc], split, random.Random(seed), num_rows)
+    part_files = [[open_text(compressed_path(svm_file_path + ".train.libsvm", compression), 'w', buffering=WRITE_BUFFER_SIZE)],
+                  [open_text(compressed_path(svm_file_path + ".test.libsvm", compression), 'w', buffering=WRITE_BUFFER_SIZE)]]
+    fold_files = []
+    try:
+        if(folds > 0):
+            assign_fold = create_split_assigner([1] * folds, split, random.Random(seed + 1), num_rows)
+            for fold in range(folds):
+                fold_prefix = svm_file_path + ".fold" + str(fold)
+                fold_files.append((open_text(compressed_path(fold_prefix + ".train.libsvm", compression), 'w', buffering=WRITE_BUFFER_SIZE),
+                                   open_text(compressed_path(fold_prefix + ".test.libsvm", compression), 'w', buffering=WRITE_BUFFER_SIZE)))
+
+        with open_text(compressed_path(svm_file_path, compression)) as svm_in_f:
+            for idx,line in enumerate(svm_in_f):
+                label = line.split(" ", 1)[0]
+                for f in part_files[assign_train(idx, label)]:
+                    f.write(line)
+                if(fold_files):
+                    test_fold = assign_fold(idx, label)
+                    for fold,(train_f, test_f) in enumerate(fold_files):
+                        if(fold == test_fold):
+                            test_f.write(line)
+                        else:
+                            train_f.write(line)
+    finally:
+        for f in [f for files in part_files for f in files] + [f for files in fold_files for f in files]:
+            f.close()
+
+def create_split_assigner(weights, split, rng, num_rows=None):
+    """ Create a function taking the index and label of each sample and returning
+    which part it goes to, parts getting samples in proportion to their integer weights.
+    Ordered splits cut the samples into consecutive runs, which needs num_rows.
+    Shuffled splits deal out shuffled blocks of sum(weights) parts, so the proportions are
+    exact every block without knowing the number of samples; stratified ones keep a block per label.
+    Weights are reduced first (50/50 deals blocks of 2), so small classes split as evenly as they can.
+    """
+    weights = [int(round(weight)) for weight in weights]
+    divisor = math.gcd(*weights)
+    if(divisor > 1):
+        weights = [weight // divisor for weight in weights]
+    if(split == ORDERED):
+        total = sum(weights)
+        bounds = []
+        weight_sum = 0
+        for weight in weights[:-1]:
+            weight_sum += weight
+            bounds.append(int((weight_sum/total) * num_rows))
+        def assign(idx, label):
+            return bisect_right(bounds, idx)
+        return assign
+
+    block = [part for part,weight in enumerate(weights) for count in range(weight)]
+    pending = {}
+    def assign(idx, label):
+        key = label if split == STRATIFIED else None
+        parts = pending.get(key)
+        if(not parts):
+            parts = pending[key] = block[:]
+            rng.shuffle(parts)
+        return parts.pop()
+    return assign
+
+def normalize_column(column, stats=None):
+    """ Normalize column data on a scale of [-1,1]
+    """
+    if(stats is None):
+        stats = column_stats(column)
+
+    # Normalize each value
+    # (value - min)/(max - min)
+    return scale_column(column, stats["min"], stats["max"] - stats["min"])
+
+def standardize_column(column, stats=None):
+    """ Standardize column data
+    """
+    if(stats is None):
+        stats = column_stats(column)
+
+    # (value - mean)/stddev
+    return scale_column(column, stats["mean"], stats["stddev"])
+
+def normalize_columns(column_table, column_names, jobs=1, target_name=None):
+    """ Normalize numeric columns in place, in up to "jobs" worker processes.
+    Columns are handed to the workers through shared memory so they are not pickled.
+    target_name labels the per-column profile stages.
+    Returns column name => stats of the column, or the exception raised for it.
+    """
+    results = {}
+    if(jobs <= 1 or len(column_names) <= 1):
+        for column_name in column_names:
+            with profile_stage("column", target=target_name, column=column_name, method=NORMALIZE, rows=len(column_table[column_name])):
+                try:
+                    stats = column_stats(column_table[column_name])
+                    normalize_column(column_table[column_name], stats)
+                    results[column_name] = stats
+                except Exception as e:
+                    results[column_name] = e
+        return results
+
+    shared_columns = {}
+    try:
+        for column_name in column_names:
+            column = column_table[column_name]
+            shm = shared_memory.SharedMemory(create=True, size=max(1, len(column)*column.itemsize))
+            shared_columns[column_name] = shm
+            shm.buf[:len(column)*column.itemsize] = column.tobytes()
+
+        with multiprocessing.Pool(min(jobs, len(column_names))) as pool:
+            pending = {column_name: pool.apply_async(normalize_shared_column, (shm.name, len(column_table[column_name])))
+                       for column_name,shm in shared_columns.items()}
+            for column_name,result in pending.items():
+                try:
+                    results[column_name] = result.get()
+                except Exception as e:
+                    results[column_name] = e
+
+        # Copy the normalized values back into the columns
+        for column_name,shm in shared_columns.items():
+            if(isinstance(results[column_name], Exception)): continue
+            column = column_table[column_name]
+            memoryview(column).cast('B')[:] = shm.buf[:len(column)*column.itemsize]
+    finally:
+        for shm in shared_columns.values():
+            shm.close()
+            shm.unlink()
+
+    return results
+
+def normalize_shared_column(shm_name, count):
+    """ Worker process side of "normalize_columns", normalizes a column held in shared memory
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    column = shm.buf[:count*8].cast('d')
+    try:
+        stats = column_stats(column)
+        normalize_column(column, stats)
+        return stats
+    finally:
+        column.release()
+        shm.close()
+
+def column_stats(column):
+    """ Find the count, min, max, mean and sample std dev of a numeric column
+    """
+    check_numeric(column)
+    count = len(column)
+    if(numpy is not None):
+        values = numpy.frombuffer(column, dtype=numpy.float64)
+        min_value = float(values.min())
+        max_value = float(values.max())
+        mean = float(values.mean())
+        stddev = float(values.std(ddof=1)) if count > 1 else 0.0
+    else:
+        min_value = min(column)
+        max_value = max(column)
+        mean = math.fsum(column)/count
+        stddev = math.sqrt(math.fsum([(value - mean)**2 for value in column])/(count - 1)) if count > 1 else 0.0
+
+    return {"count": count, "min": min_value, "max": max_value, "mean": mean, "stddev": stddev}
+
+def scale_column(column, offset, scale):
+    """ Replace each value of a numeric column with (value - offset)/scale, rounded to 4 places.
+    The column is changed in place. Both paths round the same way as numpy.round,
+    half to even after scaling by 10**4, so results do not depend on numpy being installed.
+    """
+    if(scale == 0):
+        raise ValueError("column has no spread, can not scale it")
+
+    if(numpy is not None):
+        values = numpy.frombuffer(column, dtype=numpy.float64)
+        values -= offset
+        values /= scale
+        numpy.round(values, 4, out=values)
+    else:
+        column[:] = array('d', [round((value - offset)/scale*10000)/10000 for value in column])
+
+    return column
+
+def check_numeric(column):
+    """ Raise if a numeric column is empty or holds values that could not be parsed as floats
+    """
+    if(len(column) == 0):
+        raise ValueError("column has no values")
+    if(numpy is not None):
+        has_nan = bool(numpy.isnan(numpy.frombuffer(column, dtype=numpy.float64)).any())
+    else:
+        has_nan = any([math.isnan(value) for value in column])
+    if(has_nan):
+        raise ValueError("column contains non-numeric values")
+
+def encode_column(values):
+    """ Encode a list of discrete values as a categorical column in one pass
+    """
+    column, append = create_column(CATEGORIZE)
+    for value in values:
+        append(value)
+    return column
+
+def decode_column(column):
+    """ Expand a categorical column back into a list of its values
+    """
+    return [column.levels[code] for code in column.codes]
+
+def categorize_column(column):
+    """ Create new binary asymmetric columns from a single column with discrete values.
+    Each new column is a sparse view over the shared codes of the categorical column,
+    so no per-value 0/1 lists are built.
+    """
+    if(not isinstance(column, CategoricalColumn)):
+        column = encode_column(column)
+
+    # One column per value, in sorted order so the output layout is stable between runs
+    new_columns = {}
+    for code,value in sorted(enumerate(column.levels), key=lambda level: level[1]):
+        new_columns[value] = OneHotColumn(column.codes, code)
+
+    return new_columns
+
+def enumerate_column(prefix, column, column_name, legend_file=None):
+    """ Change a column with discrete values to numerical representations.
+    Values are numbered in sorted order, or from a previously written legend
+    file when one is given so that separate runs agree on the numbers.
+    """
+    if(not isinstance(column, CategoricalColumn)):
+        column = encode_column(column)
+
+    value_labels = create_legend(column.levels, column_name, legend_file)
+    write_legend(prefix + "." + column_name + ".legend.txt", {label: value for value,label in value_labels.items()})
+
+    # Single pass over the rows through a code => label lookup
+    code_labels = [value_labels[value] for value in column.levels]
+    return array('i', [code_labels[code] for code in column.codes])
+
+def create_legend(values, column_name, legend_file=None):
+    """ Number discrete values in sorted order, after the ones already numbered
+    in legend_file when it is given. Returns a dict of value => label.
+    """
+    value_labels = {}
+    if(legend_file is not None):
+        for label,value in read_legend(legend_file).items():
+            value_labels[value] = label
+    next_label = max(value_labels.values(), default=-1) + 1
+    for value in sorted(values):
+        if(value not in value_labels):
+            if(legend_file is not None):
+                print("Value " + value + " of " + column_name + " not in " + legend_file + ", adding it")
+            value_labels[value] = next_label
+            next_label += 1
+    return value_labels
+
+def find_legend_file(legend_prefix, column_name):
+    """ Legend written for column_name under legend_prefix, None if there is none.
+    """
+    if(legend_prefix is None):
+        return None
+    legend_file = legend_prefix + "." + column_name + ".legend.txt"
+    if(not os.path.exists(legend_file)):
+        print("Could not find legend " + legend_file + ", numbering " + column_name + " from scratch")
+        return None
+    return legend_file
+
+def write_legend(legend_file, label_legend):
+    """ Write a dict of label => value as a legend file
+    """
+    with open(legend_file, "w") as f:
+        for label,value in sorted(label_legend.items()):
+            f.write(str(label) + ":" + value + "\n")
+
+def read_legend(legend_file):
+    """ Read a legend written by "enumerate_column" as a dict of label => value
+    """
+    label_legend = {}
+    with open(legend_file, "r") as f:
+        for line in f:
+            label_key, label_value = line.split(":", 1)
+            label_legend[int(label_key)] = label_value.strip()
+    return label_legend
+
+def format_for_libsvm(prefix, row_number, output_columns, target, sparse=False, compression=None):
+    """lib svm format: <label> <feature_idx>:<feature_value> <feature_idx>:<feature_value> ...
+    In sparse mode features with a value of 0 are left out, libsvm treats them as 0.
+    Returns the number of samples written.
+    """
+    set_labels, label_column, header_list = libsvm_layout(prefix, output_columns, target)
+    feature_columns = [(str(feature_num) + ":", output_columns[header]) for feature_num,header in enumerate(header_list) if feature_num > 0]
+
+    svm_rows = 0
+    with open_text(compressed_path(prefix + ".libsvm", compression), 'w', buffering=WRITE_BUFFER_SIZE) as f:
+        for row in range(row_number):
+            label = set_labels.get(label_column[row])
+            if(label is None): continue
+            line = [label]
+            for feature_prefix,column in feature_columns:
+                value = column[row]
+                if(sparse and value == 0): continue
+                line.append(feature_prefix + str(value))
+            f.write(" ".join(line) + "\n")
+            svm_rows += 1
+
+    write_libsvm_features(prefix, header_list)
+    return svm_rows
+
+def libsvm_layout(prefix, output_columns, target):
+    """ What libsvm samples are made of: enumerated label => libsvm class,
+    the label column and the output column of each feature number (0 is the label)
+    """
+    label_column_name = target["label_column"]
+
+    # Read the legend that was created from the "enumerate_column" function.
+    label_legend = read_legend(prefix + "." + label_column_name + ".legend.txt")
+
+    set_labels = libsvm_set_labels(label_legend, target["set_labels"])
+
+    header_list = [label_column_name]
+    for column_name in output_columns.keys():
+        if(column_name != label_column_name):
+            header_list.append(column_name)
+    return (set_labels, output_columns[label_column_name], header_list)
+
+def libsvm_samples(prefix, row_number, output_columns, target):
+    """ The labels and feature values of the samples "format_for_libsvm" writes, kept in memory
+    """
+    set_labels, label_column, header_list = libsvm_layout(prefix, output_columns, target)
+    feature_columns = [output_columns[header] for header in header_list[1:]]
+
+    labels = []
+    samples = []
+    for row in range(row_number):
+        label = set_labels.get(label_column[row])
+        if(label is None): continue
+        labels.append(int(label))
+        samples.append([float(column[row]) for column in feature_columns])
+    return (labels, samples)
+
+def evaluate_target(prefix, row_number, output_columns, target, split=ORDERED, seed=0, svm_options=None):
+    """ Train and test an SVM on the samples of a target without writing them out.
+    Samples are split the same way "create_test_train_files" splits the libsvm file.
+    """
+    labels, samples = libsvm_samples(prefix, row_number, output_columns, target)
+    train_perc = target["train_perc"]
+    assign_train = create_split_assigner([train_perc, 100 - train_perc], split, random.Random(seed), len(labels))
+
+    train_labels, train_samples, test_labels, test_samples = [], [], [], []
+    for idx,(label, sample) in enumerate(zip(labels, samples)):
+        if(assign_train(idx, str(label)) == 0):
+            train_labels.append(label)
+            train_samples.append(sample)
+        else:
+            test_labels.append(label)
+            test_samples.append(sample)
+
+    print("Evaluating " + target["name"] + " on", len(train_labels), "train and", len(test_labels), "test samples")
+    try:
+        return run_svm.evaluate_svm(train_labels, train_samples, test_labels, test_samples, **(svm_options or {}))
+    except ImportError as e:
+        print("Could not evaluate " + target["name"] + ":", e)
+
+def libsvm_set_labels(label_legend, set_labels):
+    """ Enumerated label => libsvm class, for the labels we want samples of
+    """
+    label_classes = {}
+    for label,value in label_legend.items():
+        if(value in set_labels.keys()):
+            label_classes[label] = str(set_labels[value])
+    return label_classes
+
+def write_libsvm_features(prefix, header_list):
+    """ Write which column each libsvm feature number came from
+    """
+    with open(prefix + ".libsvm.features.txt", 'w', encoding="utf8") as f:
+        for feature_num,header in enumerate(header_list):
+                f.write(str(feature_num) + ":" + str(header) + "\n")
+
+def create_artifact(csv_file, target_artifacts):
+    """ Fit artifact for the targets processed from csv_file, target name =>
+    label column and artifact columns of the target
+    """
+    return {"source": csv_file, "targets": target_artifacts}
+
+def save_artifact(artifact_file, artifact):
+    """ Save what is needed to process new files the same way:
+    scaling stats of normalized columns, values of categorized columns
+    and legends of enumerated columns, in output order, for each target.
+    """
+    with open(artifact_file, 'w', encoding="utf8") as f:
+        json.dump(artifact, f, indent=1)
+    print("Saved scaling artifact " + artifact_file)
+
+def load_artifact(artifact_file):
+    """ Load an artifact written by "save_artifact"
+    """
+    with open(artifact_file, 'r', encoding="utf8") as f:
+        artifact = json.load(f)
+    # JSON object keys are strings, legends are keyed by label
+    for target_artifact in artifact["targets"].values():
+        for column in target_artifact["columns"]:
+            if(column["method"] == ENUMERATE):
+                column["legend"] = {int(label): value for label,value in column["legend"].items()}
+    return artifact
+
+def create_transformers(target_artifact, header_index_table):
+    """ Build what is needed to turn CSV rows into output rows with a fit artifact.
+    Returns the output header and a list of (index in line, transformer), where each
+    transformer sets the output values of one raw value into an output row.
+    Later columns take over output columns of the same name, as they would in "process_target".
+    """
+    header_positions = {}
+    for column in target_artifact["columns"]:
+        if(column["method"] == CATEGORIZE):
+            for value in column["levels"]:
+                header_positions.setdefault(value, len(header_positions))
+        else:
+            header_positions.setdefault(column["name"], len(header_positions))
+
+    line_indexes = {header: idx for idx,header in header_index_table.items()}
+    transformers = []
+    for column in target_artifact["columns"]:
+        if(column["name"] not in line_indexes):
+            raise ValueError("column " + column["name"] + " is not in the CSV file")
+        idx = line_indexes[column["name"]]
+        if(column["method"] == NORMALIZE):
+            transformers.append((idx, create_normalize_transformer(header_positions[column["name"]], column)))
+        elif(column["method"] == CATEGORIZE):
+            transformers.append((idx, create_categorize_transformer([header_positions[value] for value in column["levels"]], column)))
+        elif(column["method"] == ENUMERATE):
+            transformers.append((idx, create_enumerate_transformer(header_positions[column["name"]], column)))
+        elif(column["method"] == NOTHING):
+            transformers.append((idx, create_nothing_transformer(header_positions[column["name"]])))
+
+    return (list(header_positions.keys()), transformers)
+
+def create_normalize_transformer(position, column):
+    """ (value - min)/(max - min) with the fitted min and max
+    """
+    min_value = column["min"]
+    spread = column["max"] - column["min"]
+    def transform(value, output_row):
+        # Raises ValueError for non-numeric values, the row is dropped
+        output_row[position] = round((float(value.strip("% ")) - min_value)/spread*10000)/10000
+    return transform
+
+def create_categorize_transformer(positions, column):
+    """ 1 in the output column of the value, 0 in the others; unseen values are all 0
+    """
+    value_positions = dict(zip(column["levels"], positions))
+    def transform(value, output_row):
+        for position in positions:
+            output_row[position] = 0
+        position = value_positions.get(value)
+        if(position is not None):
+            output_row[position] = 1
+    return transform
+
+def create_enumerate_transformer(position, column):
+    """ Label of the value in the fitted legend; unseen values are -1
+    """
+    value_labels = {value: label for label,value in column["legend"].items()}
+    def transform(value, output_row):
+        label = value_labels.get(value)
+        if(label is None):
+            print("Value " + value + " of " + column["name"] + " not in fitted legend")
+            label = value_labels[value] = -1
+        output_row[position] = label
+    return transform
+
+def create_nothing_transformer(position):
+    """ Copy the value as is
+    """
+    def transform(value, output_row):
+        output_row[position] = value
+    return transform
+
+def transform_csv_file(csv_file, targets, artifact, write_csv, svm, sparse=False, compression=None, output_name=None):
+    """ Process a CSV file with a fit artifact in a single streaming pass for all targets,
+    writing the processed CSV and libsvm rows out every CHUNK_ROWS rows.
+    Output files are named after output_name, the CSV file by default.
+    Returns target name => number of libsvm samples written.
+    """
+    print("Transforming " + csv_file)
+    for target in targets:
+        if(target["name"] not in artifact["targets"]):
+            raise ValueError("target " + target["name"] + " is not in the fit artifact")
+
+    if(output_name is None):
+        output_name = csv_file
+    lines_to_skip = source_lines_to_skip(targets)
+    header_index_table = {}
+    target_writers = []
+    svm_rows = {}
+    line_count = 0
+    try:
+        for data_line in stream_csv_file(csv_file):
+            if(line_count > lines_to_skip):
+                if(not check_line(data_line, header_index_table)): continue
+                for write_row, close in target_writers:
+                    write_row(data_line)
+            elif(line_count == lines_to_skip):
+                for idx, header in enumerate(data_line):
+                    header_index_table[idx] = header.strip("\"'")
+                # Check every target before any of them opens its output files
+                for target in targets:
+                    check_artifact_columns(target, artifact["targets"][target["name"]], header_index_table)
+                for target in targets:
+                    target_writers.append(create_target_writer(target, artifact["targets"][target["name"]], header_index_table,
+                                                               output_prefix(output_name, target), write_csv, svm, sparse, compression))
+
+            line_count += 1
+    finally:
+        for target, (write_row, close) in zip(targets, target_writers):
+            svm_rows[target["name"]] = close()
+    return svm_rows
+
+def check_artifact_columns(target, target_artifact, header_index_table):
+    """ Raise ValueError if a column fitted for a target is not in the CSV header
+    """
+    headers = set(header_index_table.values())
+    missing = [column["name"] for column in target_artifact["columns"] if column["name"] not in headers]
+    if(missing):
+        raise ValueError("columns " + ", ".join(missing) + " of target " + target["name"] + " are not in the CSV file")
+
+def create_target_writer(target, target_artifact, header_index_table, prefix, write_csv, svm, sparse=False, compression=None):
+    """ Open the output files of a target for "transform_csv_file".
+    Returns a function taking each CSV line and a function that writes
+    what is left, closes the files and returns the number of libsvm samples.
+    """
+    for column in target_artifact["columns"]:
+        if(column["method"] == ENUMERATE):
+            write_legend(prefix + "." + column["name"] + ".legend.txt", column["legend"])
+
+    output_header, transformers = create_transformers(target_artifact, header_index_table)
+    check_row = create_row_check(target, header_index_table)
+    state = {"row_number": 0, "svm_rows": 0, "dropped_rows": 0, "csv_rows": [], "svm_lines": []}
+
+    csv_f = None
+    csv_writer = None
+    if(write_csv):
+        csv_f = open_text(compressed_path(prefix + ".processed.csv", compression), 'w', newline="", buffering=WRITE_BUFFER_SIZE)
+        csv_writer = csv.writer(csv_f, lineterminator="\n")
+        csv_writer.writerow(output_header)
+
+    svm_f = None
+    if(svm):
+        label_column_name = target["label_column"]
+        label_position = output_header.index(label_column_name)
+        label_legend = [column["legend"] for column in target_artifact["columns"] if column["name"] == label_column_name][-1]
+        set_labels = libsvm_set_labels(label_legend, target["set_labels"])
+        header_list = [label_column_name] + [header for header in output_header if header != label_column_name]
+        feature_positions = [(str(feature_num) + ":", output_header.index(header)) for feature_num,header in enumerate(header_list) if feature_num > 0]
+        write_libsvm_features(prefix, header_list)
+        svm_f = open_text(compressed_path(prefix + ".libsvm", compression), 'w', buffering=WRITE_BUFFER_SIZE)
+
+    def write_row(data_line):
+        if(not check_row(data_line)): return
+        output_row = [0] * len(output_header)
+        try:
+            for idx, transform in transformers:
+                transform(data_line[idx].strip("\"'"), output_row)
+        except ValueError:
+            state["dropped_rows"] += 1
+            return
+        state["row_number"] += 1
+        if(csv_f is not None):
+            state["csv_rows"].append(output_row)
+        if(svm_f is not None):
+            label = set_labels.get(output_row[label_position])
+            if(label is not None):
+                line = [label]
+                for feature_prefix,position in feature_positions:
+                    value = output_row[position]
+                    if(sparse and value == 0): continue
+                    line.append(feature_prefix + str(value))
+                state["svm_lines"].append(" ".join(line) + "\n")
+                state["svm_rows"] += 1
+        if(state["row_number"] % CHUNK_ROWS == 0):
+            state["csv_rows"], state["svm_lines"] = write_chunk(csv_writer, state["csv_rows"], svm_f, state["svm_lines"])
+
+    def close():
+        try:
+            write_chunk(csv_writer, state["csv_rows"], svm_f, state["svm_lines"])
+        finally:
+            if(csv_f is not None): csv_f.close()
+            if(svm_f is not None): svm_f.close()
+        if(state["dropped_rows"] > 0):
+            print("Dropped", state["dropped_rows"], "rows of", target["name"], "with non-numeric values")
+        print("Done transforming " + target["name"] + ",", state["row_number"], "rows")
+        return state["svm_rows"]
+
+    return (write_row, close)
+
+def write_chunk(csv_writer, csv_rows, svm_f, svm_lines):
+    """ Write out a chunk of processed CSV rows and libsvm lines, returns new empty chunks
+    """
+    if(csv_rows):
+        csv_writer.writerows(csv_rows)
+    if(svm_lines):
+        svm_f.write("".join(svm_lines))
+    return ([], [])
+
+def fit_csv_file(csv_file, targets, legend_prefix=None):
+    """ First pass of chunked mode: gather the min/max/mean/variance of numeric columns,
+    the values of discrete columns and the legends of enumerated columns of every target
+    in a single streaming pass, holding only running statistics in memory.
+    Returns target name => artifact of the target, like "process_target" makes them.
+    """
+    print("Fitting " + csv_file)
+    lines_to_skip = source_lines_to_skip(targets)
+    header_index_table = {}
+    target_accumulators = [] # (target, column name => (index in line, accumulate, finish), row check)
+    line_count = 0
+    row_number = 0
+    for data_line in stream_csv_file(csv_file):
+        if(line_count > lines_to_skip):
+            if(not check_line(data_line, header_index_table)): continue
+            row_number += 1
+            for target, accumulators, check_row in target_accumulators:
+                if(not check_row(data_line)): continue
+                for idx, accumulate, finish in accumulators.values():
+                    accumulate(data_line[idx].strip("\"'"))
+        elif(line_count == lines_to_skip):
+            for idx, header in enumerate(data_line):
+                header_index_table[idx] = header.strip("\"'")
+            for target in targets:
+                target_legend_prefix = None if legend_prefix is None else output_prefix(legend_prefix, target)
+                accumulators = {}
+                for idx, header in header_index_table.items():
+                    if(header in target["columns"].keys()):
+                        accumulate, finish = create_accumulator(header, target["columns"][header], target_legend_prefix)
+                        accumulators[header] = (idx, accumulate, finish)
+                target_accumulators.append((target, accumulators, create_row_check(target, header_index_table)))
+
+        line_count += 1
+    print("Done fitting " + csv_file + ",", row_number, "rows")
+
+    target_artifacts = {}
+    for target, accumulators, check_row in target_accumulators:
+        artifact_columns = []
+        for column_name,method in target["columns"].items():
+            if(column_name in accumulators):
+                try:
+                    artifact_columns.append(accumulators[column_name][2]())
+                except Exception as e:
+                    print("Error on column", column_name, e)
+            else:
+                print("Skipping column " + column_name)
+        target_artifacts[target["name"]] = {"label_column": target["label_column"], "columns": artifact_columns}
+    return target_artifacts
+
+def create_accumulator(column_name, method, legend_prefix=None):
+    """ Create the running statistics of one column for "fit_csv_file".
+    Returns a function taking each raw value and a function returning the
+    artifact entry of the column once all values were seen.
+    """
+    if(method == NORMALIZE):
+        # Welford's online mean and variance
+        stats = {"count": 0, "min": math.inf, "max": -math.inf, "mean": 0.0, "m2": 0.0, "valid": True}
+        def accumulate(value):
+            try:
+                value = float(value.strip("% "))
+            except ValueError:
+                stats["valid"] = False
+                return
+            stats["count"] += 1
+            delta = value - stats["mean"]
+            stats["mean"] += delta/stats["count"]
+            stats["m2"] += delta*(value - stats["mean"])
+            if(value < stats["min"]): stats["min"] = value
+            if(value > stats["max"]): stats["max"] = value
+        def finish():
+            if(not stats["valid"]):
+                raise ValueError("column contains non-numeric values")
+            if(stats["count"] == 0):
+                raise ValueError("column has no values")
+            if(stats["max"] == stats["min"]):
+                raise ValueError("column has no spread, can not scale it")
+            stddev = math.sqrt(stats["m2"]/(stats["count"] - 1)) if stats["count"] > 1 else 0.0
+            return {"name": column_name, "method": method, "count": stats["count"],
+                    "min": stats["min"], "max": stats["max"], "mean": stats["mean"], "stddev": stddev}
+        return (accumulate, finish)
+
+    if(method == NOTHING):
+        # Passed through as is, so nothing about the values is kept
+        def accumulate(value):
+            pass
+        def finish():
+            return {"name": column_name, "method": method}
+        return (accumulate, finish)
+
+    values = set()
+    def accumulate(value):
+        values.add(value)
+    def finish():
+        if(method == CATEGORIZE):
+            return {"name": column_name, "method": method, "levels": sorted(values)}
+        value_labels = create_legend(values, column_name, find_legend_file(legend_prefix, column_name))
+        return {"name": column_name, "method": method, "legend": {label: value for value,label in value_labels.items()}}
+    return (accumulate, finish)
+
+def load_csv_files(csv_files, targets, use_cache=False, jobs=1):
+    """ Load the columns of all targets from one or more CSV files. Several files
+    are loaded in up to "jobs" worker processes and merged in the order given,
+    a single file is split into byte ranges parsed in up to "jobs" processes.
+    Returns the column table, target name => row mask (1 for the rows
+    the target can use) and the number of rows loaded.
+    """
+    if(len(csv_files) == 1):
+        loaded = load_columns(csv_files[0], targets, use_cache, jobs)
+    else:
+        file_args = [(csv_file, targets, use_cache) for csv_file in csv_files]
+        if(jobs > 1):
+            with multiprocessing.Pool(min(jobs, len(csv_files))) as pool:
+                parts = pool.starmap(load_columns, file_args)
+        else:
+            parts = [load_columns(*args) for args in file_args]
+        loaded = merge_columns(csv_files, parts, source_columns(targets))
+        print("Merged", len(csv_files), "files,", loaded[2], "rows")
+
+    column_table, missing_rows, row_number = loaded
+    return (column_table, create_row_masks(targets, column_table, missing_rows, row_number), row_number)
+
+def merge_columns(csv_files, parts, column_methods):
+    """ Merge the columns loaded from several CSV files into one table, rows in file order.
+    Headers are matched by column name; a configured column a file does not have
+    counts as missing in all of that file's rows. Values of categorical columns are
+    renumbered into one list of levels, first seen first as if the files were one.
+    Returns the column table, column name => rows missing it and the number of rows.
+    """
+    column_names = [column_name for column_name in column_methods.keys()
+                    if any([part_table.get(column_name) is not None for part_table, part_missing, part_rows in parts])]
+    column_table = {}
+    level_codes = {}
+    for column_name in column_names:
+        if(column_methods[column_name] == NORMALIZE):
+            column_table[column_name] = array('d')
+        else:
+            column_table[column_name] = CategoricalColumn(array('i'), [])
+            level_codes[column_name] = {}
+    missing_rows = {column_name: array('i') for column_name in column_names}
+
+    row_number = 0
+    for csv_file,(part_table, part_missing, part_rows) in zip(csv_files, parts):
+        for column_name in column_names:
+            column = column_table[column_name]
+            part_column = part_table.get(column_name)
+            if(part_column is None):
+                print("Column " + column_name + " is not in " + csv_file + ", treating it as missing in its", part_rows, "rows")
+                rows = range(part_rows)
+                if(isinstance(column, CategoricalColumn)):
+                    part_column = CategoricalColumn(array('i', [0]) * part_rows, [""])
+                else:
+                    part_column = array('d', [float("nan")]) * part_rows
+            else:
+                rows = part_missing[column_name]
+
+            if(isinstance(column, CategoricalColumn)):
+                append_categorical(column, level_codes[column_name], part_column)
+            else:
+                column.extend(part_column)
+            missing_rows[column_name].extend(array('i', [row + row_number for row in rows]))
+        row_number += part_rows
+
+    return (column_table, missing_rows, row_number)
+
+def append_categorical(column, level_codes, part_column):
+    """ Append the values of part_column to a categorical column, renumbering its codes
+    """
+    code_map = []
+    for value in part_column.levels:
+        code = level_codes.get(value)
+        if(code is None):
+            code = level_codes[value] = len(column.levels)
+            column.levels.append(value)
+        code_map.append(code)
+    if(numpy is not None and len(part_column.codes) > 0):
+        new_codes = numpy.asarray(code_map, dtype=numpy.intc)[numpy.frombuffer(part_column.codes, dtype=numpy.intc)]
+        column.codes.frombytes(new_codes.tobytes())
+    else:
+        column.codes.extend(array('i', [code_map[code] for code in part_column.codes]))
+
+def load_columns(csv_file, targets, use_cache=False, jobs=1):
+    """ Load the columns of all targets from one CSV file, from its column cache when
+    it is up to date, otherwise by parsing the CSV file (and refreshing the cache).
+    Returns the column table, column name => rows missing it and the number of rows loaded.
+    """
+    loaded = None
+    if(use_cache):
+        cache_file = csv_file + ".cache"
+        key = cache_key(csv_file, targets)
+        loaded = load_cache(cache_file, key)
+        if(loaded is not None):
+            print("Loaded " + csv_file + " from " + cache_file)
+
+    if(loaded is None):
+        loaded = parse_csv_file(csv_file, targets, jobs)
+        if(use_cache):
+            save_cache(cache_file, key, *loaded)
+
+    return loaded
+
+def cache_key(csv_file, targets):
+    """ What the cached columns were made from: size, modification time and a hash of the
+    first and last blocks of the CSV file, and the columns the targets load.
+    Hashing the whole file would cost about as much as parsing it.
+    """
+    stat = os.stat(csv_file)
+    file_hash = hashlib.sha1()
+    with open(csv_file, 'rb') as f:
+        file_hash.update(f.read(WRITE_BUFFER_SIZE))
+        if(stat.st_size > WRITE_BUFFER_SIZE):
+            f.seek(max(WRITE_BUFFER_SIZE, stat.st_size - WRITE_BUFFER_SIZE))
+            file_hash.update(f.read())
+
+    return {
+        "version": CACHE_VERSION,
+        "byteorder": sys.byteorder,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "hash": file_hash.hexdigest(),
+        "lines_to_skip": source_lines_to_skip(targets),
+        "columns": source_columns(targets),
+    }
+
+def save_cache(cache_file, key, column_table, missing_rows, row_number):
+    """ Write loaded columns to a binary column cache:
+    8 byte header length, JSON header, then the raw bytes of each column and its missing rows
+    at the 8 byte aligned offsets listed in the header.
+    The cache is written next to cache_file and renamed, so an interrupted write never looks complete.
+    """
+    blocks = []
+    header = {"key": key, "row_number": row_number, "columns": {}, "missing_rows": {}}
+    offset = 0
+    def add_block(data):
+        nonlocal offset
+        blocks.append((offset, data))
+        entry = {"offset": offset, "length": len(data)}
+        offset += (len(data) + 7) & ~7
+        return entry
+
+    for column_name,column in column_table.items():
+        if(isinstance(column, CategoricalColumn)):
+            entry = add_block(column.codes.tobytes())
+            entry.update({"method": CATEGORIZE, "typecode": column.codes.typecode, "levels": column.levels})
+        else:
+            entry = add_block(column.tobytes())
+            entry.update({"method": NORMALIZE, "typecode": column.typecode})
+        header["columns"][column_name] = entry
+    for column_name,rows in missing_rows.items():
+        header["missing_rows"][column_name] = add_block(rows.tobytes())
+        header["missing_rows"][column_name]["typecode"] = rows.typecode
+
+    header_bytes = json.dumps(header).encode("utf8")
+    data_start = (8 + len(header_bytes) + 7) & ~7
+    with open(cache_file + ".tmp", 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for block_offset,data in blocks:
+            f.seek(data_start + block_offset)
+            f.write(data)
+        # Empty blocks at the end are written as nothing, extend the file over them
+        f.truncate(data_start + offset)
+    os.replace(cache_file + ".tmp", cache_file)
+    print("Saved column cache " + cache_file)
+
+def load_cache(cache_file, key):
+    """ Load columns written by "save_cache" through mmap.
+    Returns None if there is no cache, it was made from something else
+    or its blocks do not hold the columns the header describes.
+    """
+    if(not os.path.exists(cache_file) or os.path.getsize(cache_file) < 8):
+        return None
+
+    with open(cache_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_length = int.from_bytes(mm[:8], "little")
+            try:
+                header = json.loads(mm[8:8 + header_length].decode("utf8"))
+            except ValueError:
+                print("Ignoring unreadable column cache " + cache_file)
+                return None
+            if(header["key"] != key):
+                print("Column cache " + cache_file + " is out of date, reloading the CSV file")
+                return None
+
+            data_start = (8 + header_length + 7) & ~7
+            row_number = header["row_number"]
+            buffer = memoryview(mm)
+            def read_block(entry):
+                start = data_start + entry["offset"]
+                if(entry["offset"] < 0 or start + entry["length"] > len(mm)):
+                    raise ValueError("block outside the file")
+                values = array(entry["typecode"])
+                values.frombytes(buffer[start:start + entry["length"]])
+                return values
+            try:
+                column_table = {}
+                for column_name,entry in header["columns"].items():
+                    values = read_block(entry)
+                    if(len(values) != row_number):
+                        raise ValueError("column " + column_name + " has " + str(len(values)) + " values")
+                    if(entry["method"] == CATEGORIZE):
+                        column_table[column_name] = CategoricalColumn(values, entry["levels"])
+                    else:
+                        column_table[column_name] = values
+                missing_rows = {}
+                for column_name,entry in header["missing_rows"].items():
+                    rows = missing_rows[column_name] = read_block(entry)
+                    if(len(rows) > 0 and (min(rows) < 0 or max(rows) >= row_number)):
+                        raise ValueError("missing rows of column " + column_name + " do not fit its values")
+            except (ValueError, KeyError, TypeError) as e:
+                print("Ignoring damaged column cache " + cache_file + ": " + str(e))
+                return None
+            finally:
+                buffer.release()
+
+    return (column_table, missing_rows, row_number)
+
+def load_db_file(db_file, csv_file, targets, db_columns=(), where=None):
+    """ Load the columns of all targets from a SQLite staging database, staging the CSV
+    file in it first when the database was made from a different file or columns.
+    Only rows matching the "where" SQL condition and a label of some target are read.
+    Returns like "load_csv_files".
+    """
+    db = sqlite3.connect(db_file)
+    try:
+        stage_csv_file(db, csv_file, targets, db_columns)
+        column_table, missing_rows, row_number = query_db_columns(db, targets, where)
+    finally:
+        db.close()
+    print("Loaded", row_number, "rows from " + db_file)
+    return (column_table, create_row_masks(targets, column_table, missing_rows, row_number), row_number)
+
+def quote_name(name):
+    """ A column name quoted for SQL
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+def stage_csv_file(db, csv_file, targets, db_columns=()):
+    """ Bulk load the configured columns and db_columns of a CSV file into the "loans" table,
+    unless the database already holds them for the same file (see "cache_key").
+    Numeric columns are stored as numbers ("12.5%" as 12.5) so SQL compares them as numbers,
+    NULL where the value is empty or not a number. Other columns, and db_columns
+    no target configures as numeric, are kept as text.
+    Rows are inserted DB_BATCH_ROWS per transaction, label and db_columns are indexed afterwards.
+    """
+    key = cache_key(csv_file, targets)
+    key["db_columns"] = sorted(db_columns)
+    key["db_version"] = DB_VERSION
+    key = json.dumps(key, sort_keys=True)
+    db.execute("CREATE TABLE IF NOT EXISTS staged (key TEXT)")
+    if(db.execute("SELECT key FROM staged").fetchone() == (key,)):
+        return
+
+    print("Staging " + csv_file + " in the database")
+    column_methods = source_columns(targets)
+    # Columns only staged for filtering are kept as text, as zip codes and ids may have leading zeros
+    for column_name in db_columns:
+        column_methods.setdefault(column_name, CATEGORIZE)
+    lines_to_skip = source_lines_to_skip(targets)
+
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    with db:
+        db.execute("DROP TABLE IF EXISTS loans")
+        db.execute("DELETE FROM staged")
+
+    data_lines = stream_csv_file(csv_file)
+    for line_count in range(lines_to_skip):
+        next(data_lines, None)
+    header = [header_name.strip("\"'") for header_name in next(data_lines, [])]
+    header_index_table = dict(enumerate(header))
+    column_indexes = [(column_name, header.index(column_name)) for column_name in column_methods.keys() if column_name in header]
+    for column_name in db_columns:
+        if(column_name not in header):
+            print("Column " + column_name + " is not in " + csv_file + ", not staging it")
+
+    column_types = ["row INTEGER PRIMARY KEY"] + [quote_name(column_name) + (" REAL" if column_methods[column_name] == NORMALIZE else " TEXT")
+                                                  for column_name, idx in column_indexes]
+    column_converters = [(idx, parse_number if column_methods[column_name] == NORMALIZE else str) for column_name, idx in column_indexes]
+    db.execute("CREATE TABLE loans (" + ", ".join(column_types) + ")")
+    insert = "INSERT INTO loans VALUES (" + ", ".join(["?"] * (len(column_indexes) + 1)) + ")"
+
+    row_number = 0
+    short_rows = 0
+    batch = []
+    for data_line in data_lines:
+        if(not check_line(data_line, header_index_table)):
+            short_rows += 1
+            continue
+        batch.append([row_number] + [convert(data_line[idx].strip("\"'")) for idx, convert in column_converters])
+        row_number += 1
+        if(len(batch) == DB_BATCH_ROWS):
+            with db:
+                db.executemany(insert, batch)
+            batch = []
+    with db:
+        db.executemany(insert, batch)
+        staged_columns = [column_name for column_name, idx in column_indexes]
+        for column_name in sorted(set([target["label_column"] for target in targets]) | set(db_columns)):
+            if(column_name in staged_columns):
+                db.execute("CREATE INDEX " + quote_name("loans_" + column_name) + " ON loans (" + quote_name(column_name) + ")")
+        db.execute("INSERT INTO staged VALUES (?)", (key,))
+
+    if(short_rows > 0):
+        print("Skipped", short_rows, "rows shorter than the header")
+    print("Staged", row_number, "rows")
+
+def parse_number(value):
+    """ A numeric CSV value as a float, None (NULL) when it is empty or not a number
+    """
+    try:
+        return float(value.strip("% "))
+    except ValueError:
+        return None
+
+def query_db_columns(db, targets, where=None):
+    """ Read the columns of all targets from the "loans" table in file order.
+    Rows with a label no target uses are left out by the query, along with
+    rows not matching the "where" SQL condition. NULL numbers count as missing.
+    Returns the column table, column name => rows missing it and the number of rows loaded.
+    """
+    staged_columns = [row[1] for row in db.execute("PRAGMA table_info(loans)")]
+    column_methods = source_columns(targets)
+    column_names = [column_name for column_name in column_methods.keys() if column_name in staged_columns]
+
+    conditions = []
+    parameters = []
+    if(where is not None):
+        conditions.append("(" + where + ")")
+    # A row is only dropped if every target would drop it for its label
+    if(all([target["label_column"] in staged_columns for target in targets])):
+        label_conditions = []
+        for target in targets:
+            label_conditions.append(quote_name(target["label_column"]) + " IN (" + ", ".join(["?"] * len(target["set_labels"])) + ")")
+            parameters.extend(target["set_labels"].keys())
+        conditions.append("(" + " OR ".join(label_conditions) + ")")
+
+    query = "SELECT " + ", ".join(["row"] + [quote_name(column_name) for column_name in column_names]) + " FROM loans"
+    if(conditions):
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY row"
+
+    column_table = {}
+    missing_rows = {}
+    column_builders = []
+    for column_name in column_names:
+        missing_rows[column_name] = array('i')
+        column_table[column_name], append = create_column(column_methods[column_name], missing_rows[column_name])
+        column_builders.append(append)
+
+    row_number = 0
+    cursor = db.execute(query, parameters)
+    while(True):
+        rows = cursor.fetchmany(CHUNK_ROWS)
+        if(not rows): break
+        for row in rows:
+            # Numeric columns hand back floats, NULL for the rows missing a number
+            for append, value in zip(column_builders, row[1:]):
+                append("" if value is None else value if isinstance(value, str) else repr(value))
+        row_number += len(rows)
+
+    return (column_table, missing_rows, row_number)
+
+def parse_csv_file(csv_file, targets, jobs=1):
+    """ Load the columns of all targets from the CSV file in one pass.
+    Only the configured columns are looked at. Empty values are loaded too,
+    the rows missing each column are recorded for "create_row_masks".
+    With jobs > 1 a large uncompressed file is split into byte ranges parsed
+    in worker processes, whose columns are concatenated in file order. If a range
+    turns out not to end on a record the file is parsed in one process instead.
+    Returns the column table, column name => rows missing it and the number of rows loaded.
+    """
+    print("Loading " + csv_file)
+    lines_to_skip = source_lines_to_skip(targets)
+    column_methods = source_columns(targets)
+
+    num_ranges = 1
+    if(jobs > 1 and compression_of(csv_file) is None):
+        num_ranges = min(jobs, os.path.getsize(csv_file) // PARSE_RANGE_BYTES)
+
+    parts = None
+    if(num_ranges > 1):
+        header, byte_ranges = split_csv_file(csv_file, lines_to_skip, num_ranges)
+        print("Parsing", len(byte_ranges), "byte ranges in parallel")
+        try:
+            with multiprocessing.Pool(len(byte_ranges)) as pool:
+                parts = pool.starmap(parse_csv_range, [(csv_file, start, end, header, column_methods) for start,end in byte_ranges])
+        except csv.Error as e:
+            print("Could not split " + csv_file + " on records (" + str(e) + "), parsing it in one process")
+            parts = None
+
+    if(parts is not None):
+        column_table, missing_rows, row_number = merge_columns([csv_file] * len(parts), [part[:3] for part in parts], column_methods)
+        short_rows = sum([part[3] for part in parts])
+    else:
+        data_lines = stream_csv_file(csv_file)
+        # Read the configured columns into memory
+        for line_count in range(lines_to_skip):
+            next(data_lines, None)
+        header = next(data_lines, [])
+        column_table, missing_rows, row_number, short_rows = parse_csv_rows(data_lines, header, column_methods)
+
+    if(short_rows > 0):
+        print("Skipped", short_rows, "rows shorter than the header")
+    print("Done loading " + csv_file)
+
+    return (column_table, missing_rows, row_number)
+
+def parse_csv_rows(data_lines, header, column_methods):
+    """ Load the configured columns of the CSV rows following a header.
+    Returns the column table, column name => rows missing it, the number of rows loaded
+    and the number of rows skipped for being shorter than the header.
+    """
+    header_index_table = {}
+    column_table = {}
+    missing_rows = {}
+    column_builders = [] # (index in line, function appending a raw value to its column)
+    for idx, header_name in enumerate(header):
+        header_name = header_name.strip("\"'")
+        header_index_table[idx] = header_name
+        if(header_name in column_methods.keys()):
+            missing_rows[header_name] = array('i')
+            column_table[header_name], append = create_column(column_methods[header_name], missing_rows[header_name])
+            column_builders.append((idx, append))
+
+    row_number = 0
+    short_rows = 0
+    for data_line in data_lines:
+        if(not check_line(data_line, header_index_table)):
+            short_rows += 1
+            continue
+        row_number +=  1
+        for idx, append in column_builders:
+            append(data_line[idx].strip("\"'"))
+
+    return (column_table, missing_rows, row_number, short_rows)
+
+def parse_csv_range(csv_file, start, end, header, column_methods):
+    """ "parse_csv_rows" on the records between two byte offsets of a CSV file, run by worker processes.
+    The range is read strictly: as the first range starts on a record, a range ending inside
+    a quoted value (the next range would start mid-record) raises csv.Error.
+    """
+    def read_lines(f):
+        position = start
+        for line in f:
+            if(position >= end): break
+            position += len(line)
+            yield line.decode("utf8")
+
+    with open(csv_file, 'rb') as f:
+        f.seek(start)
+        return parse_csv_rows(csv.reader(read_lines(f), strict=True), header, column_methods)
+
+def split_csv_file(csv_file, lines_to_skip, num_ranges):
+    """ Split the records of an uncompressed CSV file into about num_ranges byte ranges
+    of similar size. Ranges should start at the beginning of a record: a line break only ends
+    a record when an even number of quotes come before it, as values with line breaks
+    are quoted and quotes in them doubled. A quote inside an unquoted value breaks that
+    count, "parse_csv_range" finds out. Returns the header and the (start, end) ranges.
+    """
+    with open(csv_file, 'rb') as f:
+        reader = csv.reader(line.decode("utf8") for line in iter(f.readline, b""))
+        header = []
+        for line_count in range(lines_to_skip + 1):
+            header = next(reader, [])
+        # The reader takes one line at a time, so the file is at the first record
+        data_start = f.tell()
+        file_size = os.fstat(f.fileno()).st_size
+        if(data_start >= file_size):
+            return (header, [(data_start, file_size)])
+
+        bounds = [data_start]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = data_start
+            quotes = 0 # Quotes between data_start and position
+            for k in range(1, num_ranges):
+                split_at = max(position, data_start + (file_size - data_start) * k // num_ranges)
+                quotes += count_quotes(data, position, split_at)
+                position = split_at
+                # Move on to the end of a line that is not inside a quoted value
+                while(position < file_size):
+                    line_end = data.find(b"\n", position)
+                    line_end = file_size if line_end < 0 else line_end + 1
+                    quotes += count_quotes(data, position, line_end)
+                    position = line_end
+                    if(quotes % 2 == 0): break
+                if(position >= file_size): break
+                bounds.append(position)
+        bounds.append(file_size)
+
+    return (header, list(zip(bounds[:-1], bounds[1:])))
+
+def count_quotes(data, start, end, block_size=1 << 20):
+    """ Number of double quotes between two offsets of a mapped file, counted a block at a time
+    """
+    quotes = 0
+    for block_start in range(start, end, block_size):
+        quotes += data[block_start:min(end, block_start + block_size)].count(b'"')
+    return quotes
+
+def create_row_masks(targets, column_table, missing_rows, row_number):
+    """ Row mask of each target, 1 for the rows with a label it wants samples of
+    and all of its columns. Built from the label codes and the rows missing each
+    column rather than row by row, so other rows are never processed or written.
+    Reports how many rows each column drops.
+    """
+    row_masks = {}
+    for target in targets:
+        row_mask = create_label_mask(column_table.get(target["label_column"]), target["set_labels"], row_number)
+        dropped_labels = row_mask.count(0)
+        if(dropped_labels > 0):
+            print("Dropped", dropped_labels, "of", row_number, "rows of", target["name"], "with labels not in set_labels")
+        for column_name in target["columns"].keys():
+            rows = missing_rows.get(column_name)
+            if(not rows): continue
+            if(numpy is not None):
+                numpy.frombuffer(row_mask, dtype=numpy.uint8)[numpy.frombuffer(rows, dtype=numpy.intc)] = 0
+            else:
+                for row in rows:
+                    row_mask[row] = 0
+            print("Column", column_name, "is missing in", len(rows), "rows")
+        dropped_rows = row_mask.count(0) - dropped_labels
+        if(dropped_rows > 0):
+            print("Dropped", dropped_rows, "of", row_number, "rows of", target["name"], "with missing columns")
+        row_masks[target["name"]] = row_mask
+    return row_masks
+
+def create_label_mask(label_column, set_labels, row_number):
+    """ 1 for the rows whose label is in set_labels, all 1 if the label column was not loaded
+    """
+    if(label_column is None):
+        return bytearray(b"\x01") * row_number
+    keep_codes = bytes([value in set_labels for value in label_column.levels])
+    if(numpy is not None):
+        return bytearray(numpy.frombuffer(keep_codes, dtype=numpy.uint8)[numpy.frombuffer(label_column.codes, dtype=numpy.intc)].tobytes())
+    return bytearray([keep_codes[code] for code in label_column.codes])
+
+def select_rows(column_table, column_names, row_mask):
+    """ Columns of one target holding only the rows in its row mask.
+    Numeric columns are always copied since they are normalized in place.
+    Returns the target's column table and its number of rows.
+    """
+    keep_all = row_mask.count(0) == 0
+    target_table = {}
+    for column_name in column_names:
+        column = column_table.get(column_name)
+        if(column is None): continue
+        if(isinstance(column, CategoricalColumn)):
+            if(keep_all):
+                target_table[column_name] = column
+            else:
+                target_table[column_name] = drop_unused_levels(CategoricalColumn(array('i', compress(column.codes, row_mask)), column.levels))
+        else:
+            target_table[column_name] = array('d', column if keep_all else compress(column, row_mask))
+    return (target_table, len(row_mask) - row_mask.count(0))
+
+def drop_unused_levels(column):
+    """ Renumber a categorical column without the values no row uses anymore
+    """
+    used_codes = sorted(set(column.codes))
+    if(len(used_codes) == len(column.levels)):
+        return column
+    new_codes = [0] * len(column.levels)
+    for new_code,code in enumerate(used_codes):
+        new_codes[code] = new_code
+    return CategoricalColumn(array('i', [new_codes[code] for code in column.codes]), [column.levels[code] for code in used_codes])
+
+def create_column(method, missing_rows=None):
+    """ Create an empty typed column for a configuration method,
+    along with a function that appends a raw CSV value to it.
+    Rows with an empty value are added to missing_rows when it is given.
+    """
+    if(method == NORMALIZE):
+        column = array('d')
+        def append(value):
+            try:
+                column.append(float(value.strip("% ")))
+            except ValueError:
+                if(missing_rows is not None and value == ""):
+                    missing_rows.append(len(column))
+                column.append(float("nan"))
+        return (column, append)
+
+    column = CategoricalColumn(array('i'), [])
+    level_codes = {}
+    def append(value):
+        if(missing_rows is not None and value == ""):
+            missing_rows.append(len(column.codes))
+        code = level_codes.get(value)
+        if(code is None):
+            code = level_codes[value] = len(column.levels)
+            column.levels.append(value)
+        column.codes.append(code)
+    return (column, append)
+
+def stream_csv_file(csv_file):
+    """ Yield the rows of a CSV file, reading it exactly once.
+    .gz, .bz2, .xz and .zip files are decompressed as they are read.
+    Progress is reported from the byte offset into the (compressed) file.
+    """
+    file_size = os.path.getsize(csv_file)
+    raw, stream = open_source(csv_file)
+    with raw, stream:
+        reader = csv.reader(line.decode("utf8") for line in stream)
+        for line_count, data_line in enumerate(reader, 1):
+            yield data_line
+            if(line_count % 10000 == 0 and file_size > 0):
+                print(round(float(raw.tell()/file_size)*100,2), "% complete")
+
+def target_line_indexes(target, header_index_table):
+    """ Indexes in the CSV line of the columns a target is configured with
+    """
+    return [idx for idx,header in header_index_table.items() if header in target["columns"].keys()]
+
+def create_row_check(target, header_index_table):
+    """ Create a function telling if a CSV line has a label the target wants
+    samples of, checked first, and all columns of the target
+    """
+    line_indexes = target_line_indexes(target, header_index_table)
+    label_indexes = [idx for idx,header in header_index_table.items() if header == target["label_column"]]
+    set_labels = target["set_labels"]
+    def check_row(data_line):
+        for idx in label_indexes:
+            if(data_line[idx].strip("\"'") not in set_labels): return False
+        return check_columns(data_line, line_indexes)
+    return check_row
+
+def check_line(data_line, header_index_table):
+    """ Validate that the sample is a full line of the CSV file
+    """
+    if(len(data_line) < 2): return False
+    if(len(data_line) < len(header_index_table)): return False
+    return True
+
+def check_columns(data_line, line_indexes):
+    """ Validate that all columns we want exist in sample
+    """
+    for idx in line_indexes:
+        if(data_line[idx].strip("\"'") == ""): return False
+    return True
+
+if __name__ == "__main__": main()
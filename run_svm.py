@@ -0,0 +1,307 @@
+#!python3
+import argparse
+import os
+import json
+import hashlib
+import math
+import random
+import multiprocessing
+
+from calc_confusion import create_confusion_matrix
+from compressed import open_text
+
+# libsvm's own Python binding is preferred, scikit-learn's SVC wraps the same solver
+try:
+    from libsvm import svmutil
+except ImportError:
+    try:
+        import svmutil
+    except ImportError:
+        svmutil = None
+
+try:
+    from sklearn.svm import SVC
+except ImportError:
+    SVC = None
+
+def main():
+    """
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("train_file", type=str, help="libsvm file to train on")
+    parser.add_argument("test_file", type=str, help="libsvm file to test on")
+    add_svm_arguments(parser)
+    parser.add_argument("--predictions", type=str, help="Write the predicted class of each test sample to this file")
+    parser.add_argument("--search", choices=["grid", "random"], help="Try many C/gamma/class weight settings instead of one")
+    parser.add_argument("--c-values", type=float, nargs="+", default=[2**k for k in range(-5, 16, 2)], help="C values of the search (random search draws between the smallest and largest)")
+    parser.add_argument("--gamma-values", type=float, nargs="+", default=[2**k for k in range(3, -16, -2)], help="Gamma values of the search (random search draws between the smallest and largest)")
+    parser.add_argument("--weight-sets", type=str, nargs="+", default=[""], help="Class weights of the search, e.g. \"\" \"0:5\" \"0:5,1:2\"")
+    parser.add_argument("--trials", type=int, default=20, help="Number of random search trials")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the random search")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of trials run at once")
+    parser.add_argument("--out-dir", type=str, help="Directory of the search results, completed trials in it are not run again (default <train_file>.search)")
+    args = parser.parse_args()
+
+    if(args.search is not None):
+        if(svmutil is None and SVC is None):
+            print("training in process needs libsvm (pip install libsvm-official) or scikit-learn")
+            exit(1)
+        out_dir = args.out_dir if args.out_dir is not None else args.train_file + ".search"
+        if(args.search == "grid"):
+            trials = grid_trials(args.c_values, args.gamma_values, args.weight_sets)
+        else:
+            trials = random_trials(args.c_values, args.gamma_values, args.weight_sets, args.trials, args.seed)
+        search_svm(args.train_file, args.test_file, trials, out_dir, args.jobs)
+        return
+
+    train_labels, train_samples = read_libsvm_file(args.train_file)
+    test_labels, test_samples = read_libsvm_file(args.test_file)
+    try:
+        predicted_labels = evaluate_svm(train_labels, train_samples, test_labels, test_samples, **svm_options(args))
+    except ImportError as e:
+        print(e)
+        exit(1)
+
+    if(args.predictions is not None):
+        with open(args.predictions, 'w', encoding="utf8") as f:
+            for label in predicted_labels:
+                f.write(str(label) + "\n")
+
+def add_svm_arguments(parser):
+    """ Add the SVM training options to an argument parser
+    """
+    parser.add_argument("-c", "--svm-c", type=float, default=0.5, help="SVM cost parameter C")
+    parser.add_argument("-g", "--svm-gamma", type=float, default=0.5, help="RBF kernel gamma")
+    parser.add_argument("-w", "--svm-weight", type=float, nargs=2, action="append", default=[], metavar=("CLASS", "WEIGHT"),
+                        help="Multiply C by WEIGHT for samples of CLASS, can be repeated")
+
+def svm_options(args):
+    """ Keyword arguments of "train_svm" from parsed SVM options
+    """
+    return {"c": args.svm_c, "gamma": args.svm_gamma,
+            "class_weights": {int(label): weight for label,weight in args.svm_weight}}
+
+def read_libsvm_file(svm_file_path):
+    """ Read a libsvm file, compressed or not, as a list of labels and a list of samples,
+    each sample a dict of feature number => value
+    """
+    labels = []
+    samples = []
+    with open_text(svm_file_path) as f:
+        for line in f:
+            fields = line.split()
+            if(len(fields) == 0): continue
+            labels.append(int(fields[0]))
+            sample = {}
+            for field in fields[1:]:
+                feature_num, value = field.split(":", 1)
+                sample[int(feature_num)] = float(value)
+            samples.append(sample)
+    return (labels, samples)
+
+def evaluate_svm(train_labels, train_samples, test_labels, test_samples, c=0.5, gamma=0.5, class_weights=None):
+    """ Train an RBF SVM and print the accuracy and confusion matrix on the test samples.
+    Returns the predicted labels.
+    """
+    model = train_svm(train_labels, train_samples, c, gamma, class_weights)
+    predicted_labels = predict_svm(model, test_samples)
+
+    correct, confusion_matrix = score_predictions(test_labels, predicted_labels)
+    print("Accuracy = " + str(round(correct/max(1, len(test_labels))*100, 4)) + "% (" + str(correct) + "/" + str(len(test_labels)) + ")")
+    for row in confusion_matrix:
+        print(row, sum(row))
+    return predicted_labels
+
+def score_predictions(test_labels, predicted_labels):
+    """ Number of correct predictions and the confusion matrix
+    """
+    correct = sum([1 for actual,predicted in zip(test_labels, predicted_labels) if actual == predicted])
+    return (correct, create_confusion_matrix(test_labels, predicted_labels, set(test_labels) | set(predicted_labels)))
+
+def train_svm(labels, samples, c=0.5, gamma=0.5, class_weights=None):
+    """ Train an RBF SVM, the same as "svm-train -t 2 -c C -g GAMMA -wCLASS WEIGHT".
+    Samples are lists of feature values (feature 1 first) or dicts of feature number => value.
+    """
+    class_weights = class_weights or {}
+    if(svmutil is not None):
+        options = "-q -t 2 -c " + str(c) + " -g " + str(gamma)
+        for label,weight in sorted(class_weights.items()):
+            options += " -w" + str(label) + " " + str(weight)
+        return svmutil.svm_train(labels, samples, options)
+    if(SVC is not None):
+        model = SVC(kernel="rbf", C=c, gamma=gamma, class_weight=class_weights or None)
+        model.fit(dense_samples(samples), labels)
+        return model
+    raise ImportError("training in process needs libsvm (pip install libsvm-official) or scikit-learn")
+
+def predict_svm(model, samples):
+    """ Predicted class of each sample with a model from "train_svm"
+    """
+    if(svmutil is not None):
+        predicted_labels, accuracy, values = svmutil.svm_predict([0] * len(samples), samples, model, "-q")
+        return [int(label) for label in predicted_labels]
+    return [int(label) for label in model.predict(dense_samples(samples, model.n_features_in_))]
+
+def dense_samples(samples, num_features=None):
+    """ Samples as lists of feature values, for scikit-learn
+    """
+    if(num_features is None):
+        num_features = max([max(sample.keys(), default=0) if isinstance(sample, dict) else len(sample) for sample in samples], default=0)
+    dense = []
+    for sample in samples:
+        if(isinstance(sample, dict)):
+            row = [0.0] * num_features
+            for feature_num,value in sample.items():
+                if(feature_num <= num_features):
+                    row[feature_num - 1] = value
+            dense.append(row)
+        else:
+            dense.append(list(sample[:num_features]) + [0.0] * (num_features - len(sample)))
+    return dense
+
+def parse_class_weights(weight_set):
+    """ Class weights from "CLASS:WEIGHT,CLASS:WEIGHT", an empty string is no weights
+    """
+    class_weights = {}
+    for pair in weight_set.split(","):
+        if(pair.strip() == ""): continue
+        label, weight = pair.split(":", 1)
+        class_weights[int(label)] = float(weight)
+    return class_weights
+
+def grid_trials(c_values, gamma_values, weight_sets):
+    """ Every combination of C, gamma and class weights
+    """
+    return [{"c": c, "gamma": gamma, "class_weights": parse_class_weights(weight_set)}
+            for c in c_values for gamma in gamma_values for weight_set in weight_sets]
+
+def random_trials(c_values, gamma_values, weight_sets, num_trials, seed=0):
+    """ C and gamma drawn log-uniformly between the smallest and largest given values,
+    class weights drawn from the given sets
+    """
+    rng = random.Random(seed)
+    def draw(values):
+        low, high = math.log2(min(values)), math.log2(max(values))
+        return round(2**rng.uniform(low, high), 6)
+    return [{"c": draw(c_values), "gamma": draw(gamma_values), "class_weights": parse_class_weights(rng.choice(weight_sets))}
+            for trial in range(num_trials)]
+
+def trial_name(trial):
+    """ File name of a trial's results, made from its settings
+    """
+    name = "c" + repr(trial["c"]) + "_g" + repr(trial["gamma"])
+    for label,weight in sorted(trial["class_weights"].items()):
+        name += "_w" + str(label) + "-" + repr(weight)
+    return name
+
+def search_svm(train_file, test_file, trials, out_dir, jobs=1):
+    """ Run SVM trials in up to "jobs" worker processes. Each trial writes
+    <out_dir>/<trial name>.json and .predictions.txt; trials that already have
+    their .json made from the same train and test files (see "data_stamp") are
+    loaded instead of run again, so an interrupted search resumes.
+    Results of the trials are written to <out_dir>/search.csv, best first.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    data = data_stamp(train_file, test_file)
+    results = []
+    pending = []
+    stale = 0
+    for trial in trials:
+        result_file = os.path.join(out_dir, trial_name(trial) + ".json")
+        result = None
+        if(os.path.exists(result_file)):
+            with open(result_file, 'r', encoding="utf8") as f:
+                result = json.load(f)
+            if(result.get("data") != data):
+                stale += 1
+                result = None
+        if(result is not None):
+            # JSON object keys are strings, class weights are keyed by class
+            result["class_weights"] = {int(label): weight for label,weight in result["class_weights"].items()}
+            results.append(result)
+        elif(trial not in pending):
+            pending.append(trial)
+    if(stale > 0):
+        print(stale, "trials were run on other train/test data, running them again")
+    print(len(results), "trials already done,", len(pending), "to run")
+
+    if(pending):
+        if(jobs <= 1):
+            init_search_worker(train_file, test_file)
+            for trial in pending:
+                results.append(report_trial(run_trial(trial, out_dir, data)))
+        else:
+            with multiprocessing.Pool(jobs, init_search_worker, (train_file, test_file)) as pool:
+                for result in pool.imap_unordered(run_trial_args, [(trial, out_dir, data) for trial in pending]):
+                    results.append(report_trial(result))
+
+    results.sort(key=lambda result: result["accuracy"], reverse=True)
+    with open(os.path.join(out_dir, "search.csv"), 'w', encoding="utf8") as f:
+        f.write("c,gamma,class_weights,accuracy,correct,total\n")
+        for result in results:
+            class_weights = " ".join([str(label) + ":" + str(weight) for label,weight in sorted(result["class_weights"].items())])
+            f.write(",".join([str(result["c"]), str(result["gamma"]), class_weights,
+                              str(result["accuracy"]), str(result["correct"]), str(result["total"])]) + "\n")
+    if(results):
+        best = results[0]
+        print("Best: -c", best["c"], "-g", best["gamma"], best["class_weights"] or "", "accuracy", str(best["accuracy"]) + "%")
+    return results
+
+def data_stamp(train_file, test_file):
+    """ What a trial was run on: the path, size, modification time and a hash
+    of the first and last MiB of the train and test files
+    """
+    stamp = {}
+    for name,path in [("train", train_file), ("test", test_file)]:
+        stat = os.stat(path)
+        file_hash = hashlib.sha1()
+        with open(path, 'rb') as f:
+            file_hash.update(f.read(1 << 20))
+            if(stat.st_size > 1 << 20):
+                f.seek(max(1 << 20, stat.st_size - (1 << 20)))
+                file_hash.update(f.read())
+        stamp[name] = {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": file_hash.hexdigest()}
+    return stamp
+
+# Train and test samples of a worker process, read once by "init_search_worker"
+search_data = {}
+
+def init_search_worker(train_file, test_file):
+    """ Read the train and test files once per worker process
+    """
+    search_data["train"] = read_libsvm_file(train_file)
+    search_data["test"] = read_libsvm_file(test_file)
+
+def run_trial_args(args):
+    """ "run_trial" taking a tuple of its arguments, for Pool.imap_unordered
+    """
+    return run_trial(*args)
+
+def run_trial(trial, out_dir, data=None):
+    """ Train and test one setting and write its predictions and results,
+    along with the "data_stamp" of the files it was run on
+    """
+    train_labels, train_samples = search_data["train"]
+    test_labels, test_samples = search_data["test"]
+    model = train_svm(train_labels, train_samples, trial["c"], trial["gamma"], trial["class_weights"])
+    predicted_labels = predict_svm(model, test_samples)
+    correct, confusion_matrix = score_predictions(test_labels, predicted_labels)
+
+    name = os.path.join(out_dir, trial_name(trial))
+    with open(name + ".predictions.txt", 'w', encoding="utf8") as f:
+        f.write("".join([str(label) + "\n" for label in predicted_labels]))
+    result = dict(trial, accuracy=round(correct/max(1, len(test_labels))*100, 4), correct=correct,
+                  total=len(test_labels), confusion_matrix=confusion_matrix, data=data)
+    # Write then rename, so an interrupted trial never looks completed
+    with open(name + ".json.tmp", 'w', encoding="utf8") as f:
+        json.dump(result, f, indent=1)
+    os.replace(name + ".json.tmp", name + ".json")
+    return result
+
+def report_trial(result):
+    """ Print the outcome of a trial as it completes
+    """
+    print("-c", result["c"], "-g", result["gamma"], result["class_weights"] or "", "accuracy", str(result["accuracy"]) + "%")
+    return result
+
+if __name__ == "__main__": main()
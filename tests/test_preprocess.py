@@ -0,0 +1,85 @@
+import os
+import sys
+import csv
+import random
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import preprocess
+
+def column_values(column_table):
+    """ Comparable contents of a column table, NaN values compare equal as bytes
+    """
+    values = {}
+    for column_name,column in column_table.items():
+        if(isinstance(column, preprocess.CategoricalColumn)):
+            values[column_name] = (column.codes.tobytes(), column.levels)
+        else:
+            values[column_name] = column.tobytes()
+    return values
+
+class ParallelParseTest(unittest.TestCase):
+    """ Parsing a CSV file in byte ranges must give what a serial parse gives
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.range_bytes = preprocess.PARSE_RANGE_BYTES
+        preprocess.PARSE_RANGE_BYTES = 100
+        self.targets = [{"name": "test", "lines_to_skip": 1, "label_column": "status", "set_labels": {"A": 0, "B": 1}, "train_perc": 50,
+                         "columns": {"amount": "normalize", "title": "categorize", "desc": "nothing", "status": "enumerate"}}]
+
+    def tearDown(self):
+        preprocess.PARSE_RANGE_BYTES = self.range_bytes
+        self.temp_dir.cleanup()
+
+    def write_csv(self, rows):
+        csv_file = os.path.join(self.temp_dir.name, "loans.csv")
+        with open(csv_file, 'w', encoding="utf8", newline="") as f:
+            f.write("Notes offered by Prospectus\n")
+            f.write("\"id\",\"amount\",\"title\",\"desc\",\"status\"\n")
+            f.writelines(rows)
+        return csv_file
+
+    def loan_rows(self, num_rows, title):
+        rng = random.Random(0)
+        rows = []
+        for row in range(num_rows):
+            desc = "line one\nline \"\"two\"\"" if rng.random() < 0.2 else "short"
+            rows.append("\"" + str(row) + "\",\"" + str(rng.randint(1000, 35000)) + "\",\"" + title(row) +
+                        "\",\"" + desc + "\",\"" + rng.choice("AB") + "\"\n")
+        return rows
+
+    def check_parallel_parse(self, csv_file, num_rows):
+        serial = preprocess.parse_csv_file(csv_file, self.targets)
+        self.assertEqual(serial[2], num_rows)
+        for jobs in [2, 4, 8]:
+            parallel = preprocess.parse_csv_file(csv_file, self.targets, jobs)
+            self.assertEqual(parallel[2], serial[2])
+            self.assertEqual(column_values(parallel[0]), column_values(serial[0]))
+            self.assertEqual(parallel[1], serial[1])
+
+    def test_quoted_line_breaks(self):
+        self.check_parallel_parse(self.write_csv(self.loan_rows(4000, lambda row: "Sales rep")), 4000)
+
+    def test_quote_inside_unquoted_value(self):
+        # csv.reader keeps a quote inside an unquoted value, so it does not start a quoted value
+        rows = self.loan_rows(4000, lambda row: "Sales rep")
+        rows[10] = rows[10].replace("\"Sales rep\"", "Sales 5'10\" rep")
+        self.check_parallel_parse(self.write_csv(rows), 4000)
+
+class SplitAssignerTest(unittest.TestCase):
+    """ Samples are dealt out to train and test parts in proportion to their weights
+    """
+    def test_stratified_small_class(self):
+        for seed in range(5):
+            assign = preprocess.create_split_assigner([50, 50], preprocess.STRATIFIED, random.Random(seed))
+            parts = [assign(idx, "rare") for idx in range(10)]
+            self.assertEqual(parts.count(0), 5)
+
+    def test_shuffled_weights(self):
+        assign = preprocess.create_split_assigner([80, 20], preprocess.SHUFFLED, random.Random(0))
+        parts = [assign(idx, None) for idx in range(10)]
+        self.assertEqual(parts.count(1), 2)
+
+if __name__ == "__main__": unittest.main()